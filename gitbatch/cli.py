@@ -2,8 +2,14 @@
 """Main program."""
 
 import argparse
+import math
 import os
+import sys
 import tempfile
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
 from pathlib import Path
 from shutil import ignore_patterns
 from typing import Any
@@ -13,7 +19,36 @@ import git
 
 from gitbatch import __version__
 from gitbatch.logging import SingleLog
-from gitbatch.utils import copy, normalize_path, to_bool
+from gitbatch.utils import (
+    cache_dir,
+    copy,
+    normalize_path,
+    parse_size,
+    refs,
+    staging,
+    submodules,
+    to_bool,
+)
+from gitbatch.utils.cache import RepoCache
+from gitbatch.utils.history import History, history_key, order_entries
+from gitbatch.utils.index import BatchIndex, find_conflicts, index_key
+from gitbatch.utils.progress import PROGRESS_MODES, BatchProgress, RepoProgress
+from gitbatch.utils.shard import parse_shard, shard_entries, shard_key
+from gitbatch.utils.staging import PUBLISH_MODES, DiskBudget, overlap_groups, tree_size
+from gitbatch.utils.summary import EntryError, format_json, format_table
+
+MISSING_REF_PATTERNS = [
+    "could not find remote branch",
+    "couldn't find remote ref",
+    "not our ref",
+]
+
+ORDER_MODES = ["history", "file"]
+
+SKIP_REASONS = {
+    "missing-branch": "remote ref not found",
+    "skipped-existing": "directory already exists",
+}
 
 
 class GitBatch:
@@ -24,6 +59,16 @@ class GitBatch:
         self.logger = self.log.logger
         self.args = self._cli_args()
         self.config: dict[str, Any] = self._config()
+        self.history = History(os.path.join(self.config["cache_dir"], "history.json"))
+        self.manifest = History(os.path.join(self.config["cache_dir"], "manifest.json"))
+        self.cache = (
+            RepoCache(os.path.join(self.config["cache_dir"], "repos"))
+            if self.config["cache"] or self.config["publish"] == "worktree"
+            else None
+        )
+        self._listed_urls: dict[str, str] = {}
+        self._submodule_urls: set[str] = set()
+        self._submodule_lock = threading.Lock()
         self.run()
 
     def _cli_args(self) -> argparse.Namespace:
@@ -37,6 +82,38 @@ class GitBatch:
         parser.add_argument(
             "-q", dest="logging.level", action="append_const", const=1, help="decrease log level"
         )
+        parser.add_argument(
+            "--check",
+            dest="check",
+            action="store_true",
+            default=None,
+            help="validate the batchfile and report all problems without cloning",
+        )
+        parser.add_argument(
+            "--shard",
+            dest="shard",
+            metavar="I/N",
+            help="only process shard I of N of the batchfile entries",
+        )
+        parser.add_argument(
+            "--shard-weights",
+            dest="shard_weights",
+            metavar="FILE",
+            help="balance shards by the entry durations recorded in a history file",
+        )
+        parser.add_argument(
+            "--keep-going",
+            dest="keep_going",
+            action="store_true",
+            default=None,
+            help="process all entries and report failures at the end",
+        )
+        parser.add_argument(
+            "--summary",
+            dest="summary",
+            metavar="FILE",
+            help="write the per-entry results as JSON to FILE, '-' for stdout",
+        )
 
         return parser.parse_args()
 
@@ -59,100 +136,606 @@ class GitBatch:
         config["ignore_existing"] = to_bool(os.environ.get("GIT_BATCH_IGNORE_EXISTING", True))
         config["ignore_missing"] = to_bool(os.environ.get("GIT_BATCH_IGNORE_MISSING_REMOTE", True))
 
+        config["progress"] = str(os.environ.get("GIT_BATCH_PROGRESS", "auto")).lower()
+        if config["progress"] not in PROGRESS_MODES:
+            self.log.sysexit_with_message(
+                "Invalid progress mode '{}', expected one of: {}".format(
+                    config["progress"], ", ".join(PROGRESS_MODES)
+                )
+            )
+
+        progress_interval = os.environ.get("GIT_BATCH_PROGRESS_INTERVAL")
+        config["progress_interval"] = None
+        if progress_interval:
+            try:
+                config["progress_interval"] = float(progress_interval)
+                if (
+                    not math.isfinite(config["progress_interval"])
+                    or config["progress_interval"] < 0
+                ):
+                    raise ValueError(progress_interval)
+            except ValueError:
+                self.log.sysexit_with_message(
+                    f"Invalid progress interval '{progress_interval}', "
+                    "expected a non-negative number of seconds"
+                )
+
+        config["jobs"] = self._config_count("GIT_BATCH_JOBS", 1)
+        config["cache_dir"] = normalize_path(os.environ.get("GIT_BATCH_CACHE_DIR", cache_dir()))
+        config["order"] = str(os.environ.get("GIT_BATCH_ORDER", "history")).lower()
+        if config["order"] not in ORDER_MODES:
+            self.log.sysexit_with_message(
+                "Invalid order '{}', expected one of: {}".format(
+                    config["order"], ", ".join(ORDER_MODES)
+                )
+            )
+
+        config["cache"] = to_bool(os.environ.get("GIT_BATCH_CACHE", False))
+        config["submodules"] = to_bool(os.environ.get("GIT_BATCH_SUBMODULES", False))
+        config["submodule_jobs"] = self._config_count("GIT_BATCH_SUBMODULE_JOBS", 4)
+        config["staging_dir"] = normalize_path(os.environ.get("GIT_BATCH_STAGING_DIR"))
+
+        config["publish"] = str(os.environ.get("GIT_BATCH_PUBLISH", "copy")).lower()
+        if config["publish"] not in PUBLISH_MODES:
+            self.log.sysexit_with_message(
+                "Invalid publish mode '{}', expected one of: {}".format(
+                    config["publish"], ", ".join(PUBLISH_MODES)
+                )
+            )
+
+        config["check"] = to_bool(
+            tmp_dict.get("check") or os.environ.get("GIT_BATCH_CHECK", False)
+        )
+        config["index"] = to_bool(os.environ.get("GIT_BATCH_INDEX", True))
+        config["keep_going"] = to_bool(
+            tmp_dict.get("keep_going") or os.environ.get("GIT_BATCH_KEEP_GOING", False)
+        )
+        config["summary"] = tmp_dict.get("summary") or os.environ.get("GIT_BATCH_SUMMARY")
+
+        shard = tmp_dict.get("shard") or os.environ.get("GIT_BATCH_SHARD")
+        try:
+            config["shard"] = parse_shard(shard) if shard else None
+        except ValueError as e:
+            self.log.sysexit_with_message(f"Invalid shard: {e}")
+        config["shard_weights"] = normalize_path(
+            tmp_dict.get("shard_weights") or os.environ.get("GIT_BATCH_SHARD_WEIGHTS")
+        )
+
+        disk_budget = os.environ.get("GIT_BATCH_DISK_BUDGET")
+        try:
+            config["disk_budget"] = parse_size(disk_budget) if disk_budget else None
+        except ValueError as e:
+            self.log.sysexit_with_message(f"Invalid disk budget: {e}")
+
         return config
 
+    def _config_count(self, name: str, default: int) -> int:
+        value = os.environ.get(name)
+        if not value:
+            return default
+
+        try:
+            return max(int(value), 1)
+        except ValueError:
+            self.log.sysexit_with_message(f"Invalid {name} '{value}', expected an integer")
+            return default
+
     def _repos_from_file(self, src: str) -> list[dict[str, Any]]:
-        repos = []
-        with open(src) as f:
-            for num, line in enumerate(f, start=1):
-                repo: dict[str, Any] = {}
-                line = line.strip()
-                if line and not line.startswith("#"):
-                    try:
-                        url, src, dest = (x.strip() for x in line.split(";"))
-                        branch, *_ = (x.strip() for x in src.split(":"))
-
-                        path = None
-                        if len(_) > 0:
-                            path = Path(_[0])
-                            path = path.relative_to(path.anchor)
-
-                    except ValueError as e:
-                        self.log.sysexit_with_message(
-                            f"Wrong number of delimiters in line {num}: {e}"
-                        )
-
-                    if url:
-                        url_parts = urlparse(url)
-
-                        repo["url"] = url
-                        repo["branch"] = branch or "main"
-                        repo["path"] = path
-                        repo["name"] = os.path.basename(url_parts.path)
-                        repo["rel_dest"] = dest
-                        dest_path = normalize_path(dest)
-                        if dest_path is None:
-                            dest_path = normalize_path("./{}".format(repo["name"]))
-                        repo["dest"] = (
-                            dest_path if dest_path is not None else "./{}".format(repo["name"])
-                        )
-
-                        repos.append(repo)
-                    else:
-                        self.log.sysexit_with_message(f"Repository Url is not set on line {num}")
+        with open(src, "rb") as f:
+            content = f.read()
+
+        index = BatchIndex(os.path.join(self.config["cache_dir"], "index"))
+        key = index_key(content) if self.config["index"] else None
+        if key:
+            cached = index.load(src, key)
+            if cached is not None:
+                self.logger.debug(f"Using compiled index of '{src}'")
+                return cached
+
+        try:
+            lines = self._batchfile_lines(content)
+        except ValueError as e:
+            self.log.sysexit_with_message(str(e))
+
+        repos: list[dict[str, Any]] = []
+        for num, line in enumerate(lines, start=1):
+            try:
+                repo = self._repo_from_line(num, line)
+            except ValueError as e:
+                self.log.sysexit_with_message(str(e))
+            if repo is not None:
+                repo["index"] = len(repos)
+                repos.append(repo)
+
+        if key:
+            try:
+                index.save(src, key, repos)
+            except OSError as e:
+                self.logger.warning(f"Unable to save batchfile index: {e}")
         return repos
 
+    def _batchfile_lines(self, content: bytes) -> list[str]:
+        try:
+            text = content.decode("utf-8")
+        except UnicodeDecodeError as e:
+            num = content.count(b"\n", 0, e.start) + 1
+            raise ValueError(f"Invalid UTF-8 in line {num}: {e.reason}") from e
+        return text.splitlines()
+
+    def _repo_from_line(self, num: int, line: str) -> dict[str, Any] | None:
+        repo: dict[str, Any] = {}
+        line = line.strip()
+        if not line or line.startswith("#"):
+            return None
+
+        try:
+            url, src, dest = (x.strip() for x in line.split(";"))
+            branch, *_ = (x.strip() for x in src.split(":"))
+
+            path = None
+            if len(_) > 0:
+                path = Path(_[0])
+                path = path.relative_to(path.anchor)
+
+        except ValueError as e:
+            raise ValueError(f"Wrong number of delimiters in line {num}: {e}") from e
+
+        if not url:
+            raise ValueError(f"Repository Url is not set on line {num}")
+
+        url_parts = urlparse(url)
+
+        repo["line"] = num
+        repo["url"] = url
+        repo["branch"], repo["ref_type"] = refs.parse_ref(branch or "main")
+        repo["pinned"] = refs.is_pinned(repo["ref_type"])
+        repo["path"] = path
+        repo["name"] = os.path.basename(url_parts.path)
+        repo["rel_dest"] = dest
+        dest_path = normalize_path(dest)
+        if dest_path is None:
+            dest_path = normalize_path("./{}".format(repo["name"]))
+        repo["dest"] = dest_path if dest_path is not None else "./{}".format(repo["name"])
+
+        return repo
+
+    def _repos_check(self, src: str) -> None:
+        problems = []
+        repos = []
+        with open(src, "rb") as f:
+            content = f.read()
+
+        try:
+            lines = self._batchfile_lines(content)
+        except ValueError as e:
+            # Keep checking the remaining lines for further problems
+            problems.append(str(e))
+            lines = content.decode("utf-8", "replace").splitlines()
+
+        for num, line in enumerate(lines, start=1):
+            try:
+                repo = self._repo_from_line(num, line)
+            except ValueError as e:
+                problems.append(str(e))
+                continue
+            if repo is not None:
+                repos.append(repo)
+
+        problems += find_conflicts(repos)
+        rel_src = os.path.relpath(os.path.join("./", src))
+        if problems:
+            for problem in problems:
+                self.logger.error(f"Error: {problem}")
+            self.log.sysexit_with_message(f"Found {len(problems)} problems in '{rel_src}'")
+
+        self.logger.info(f"Found no problems in {len(repos)} entries of '{rel_src}'")
+
+    def _repos_shard(self, repos: list[dict[str, Any]]) -> list[dict[str, Any]]:
+        if not self.config["shard"]:
+            return repos
+
+        index, count = self.config["shard"]
+        weights: dict[str, float] | None = None
+        if self.config["shard_weights"]:
+            try:
+                history = History(self.config["shard_weights"], strict=True)
+            except (OSError, ValueError) as e:
+                self.log.sysexit_with_message(f"Unable to read shard weights: {e}")
+            weights = {}
+            for repo in repos:
+                duration = history.get(history_key(repo)).get("duration")
+                if duration is not None:
+                    key = shard_key(repo)
+                    weights[key] = weights.get(key, 0.0) + duration
+
+        selected = shard_entries(repos, index, count, weights)
+        self.logger.info(
+            f"Processing shard {index}/{count} with {len(selected)} of {len(repos)} entries"
+        )
+        return selected
+
     def _repos_clone(self, repos: list[dict[str, Any]]) -> None:
+        progress = BatchProgress(
+            len(repos), mode=self.config["progress"], interval=self.config["progress_interval"]
+        )
+        budget = DiskBudget(self.config["disk_budget"])
+
+        if self.config["staging_dir"]:
+            os.makedirs(self.config["staging_dir"], 0o750, exist_ok=True)
+
+        self._listed_urls = {submodules.normalize_url(repo["url"]): repo["url"] for repo in repos}
+
+        # Copy publishing merges into existing directories, so entries with the
+        # same or nested destinations run one after another in batchfile order.
+        # Each of them waits outside the queue until its predecessor finished.
+        after: dict[int, int] = {}
+        for group in overlap_groups(repos):
+            chain = sorted(repos[i]["index"] for i in group)
+            after.update(zip(chain[1:], chain, strict=False))
+
+        if self.config["order"] == "history":
+            repos = order_entries(repos, self.history, self.config["jobs"])
+        pending: deque[tuple[dict[str, Any], int | None]] = deque()
+        waiting: dict[int, tuple[dict[str, Any], int | None]] = {}
         for repo in repos:
-            with tempfile.TemporaryDirectory(prefix="gitbatch_") as tmp:
-                try:
-                    options = ["--branch={}".format(repo["branch"]), "--single-branch"]
-                    git.Repo.clone_from(repo["url"], tmp, multi_options=options)
+            item = (repo, self._repo_footprint(repo))
+            if repo["index"] in after:
+                waiting[after[repo["index"]]] = item
+            else:
+                pending.append(item)
+
+        running: dict[Future[dict[str, Any]], int] = {}
+        results = []
+        try:
+            with ThreadPoolExecutor(max_workers=self.config["jobs"]) as pool:
+                while pending or running:
+                    while pending and len(running) < self.config["jobs"]:
+                        index = budget.admit(estimate for _, estimate in pending)
+                        if index is None:
+                            break
+
+                        # Without a budget the head is always admitted
+                        if index == 0:
+                            repo, estimate = pending.popleft()
+                        else:
+                            repo, estimate = pending[index]
+                            del pending[index]
+                        held = budget.acquire(estimate)
+                        running[pool.submit(self._repo_job, repo, progress)] = held
+
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        budget.release(running.pop(future))
+                        results.append(future.result())
+                        successor = waiting.pop(results[-1]["index"], None)
+                        if successor is not None:
+                            pending.appendleft(successor)
+        finally:
+            progress.close()
+            try:
+                self.history.save()
+                self.manifest.save()
+            except OSError as e:
+                self.logger.warning(f"Unable to save run history: {e}")
+
+        if self.config["keep_going"] or self.config["summary"]:
+            self._repos_summary(sorted(results, key=lambda r: r["index"]))
+
+    def _repos_summary(self, results: list[dict[str, Any]]) -> None:
+        summary = self.config["summary"]
+        if summary == "-":
+            sys.stdout.write(format_json(results))
+        else:
+            if self.config["keep_going"]:
+                sys.stdout.write(format_table(results))
+            if summary:
+                with open(normalize_path(summary) or summary, "w") as f:
+                    f.write(format_json(results))
+
+        failed = [r for r in results if self._result_failed(r)]
+        if failed:
+            self.log.sysexit_with_message(f"{len(failed)} of {len(results)} entries failed")
+
+    def _result_failed(self, result: dict[str, Any]) -> bool:
+        if result["status"] == "missing-branch":
+            return not self.config["ignore_missing"]
+        if result["status"] == "skipped-existing":
+            return not self.config["ignore_existing"]
+        return bool(result["status"] == "failed")
+
+    def _repo_footprint(self, repo: dict[str, Any]) -> int | None:
+        if self.config["disk_budget"] is None:
+            return None
+        if self._use_worktree(repo):
+            return 0
+
+        size: int | None = self.history.get(history_key(repo)).get("size")
+        if size is None and self.cache is not None and os.path.isdir(self.cache.path(repo["url"])):
+            size = tree_size(self.cache.path(repo["url"]))
+        return size
+
+    def _repo_job(self, repo: dict[str, Any], progress: BatchProgress) -> dict[str, Any]:
+        result = {
+            "index": repo["index"],
+            "name": repo["name"],
+            "url": repo["url"],
+            "ref": repo["branch"],
+            "dest": repo["rel_dest"] or repo["dest"],
+            "status": "ok",
+            "reason": "",
+        }
+
+        if self._manifest_hit(repo):
+            result["reason"] = "already at {}".format(repo["branch"])
+            self.logger.info(
+                "Skipping '{}', '{}' is already at {}".format(
+                    repo["name"], repo["rel_dest"], repo["branch"]
+                )
+            )
+            progress.finish(None)
+            return result
+
+        handler = progress.start(repo["name"])
+        if handler is None and self.config["order"] == "history":
+            # Count the transferred bytes for the history without progress output
+            handler = RepoProgress(progress, repo["name"])
+        start = time.monotonic()
+        size = None
+        try:
+            if self._use_worktree(repo):
+                result["status"] = self._repo_worktree(repo, handler)
+            else:
+                result["status"], size = self._repo_clone(repo, handler)
+        except EntryError as e:
+            result["status"], result["reason"] = e.status, e.reason
+        except (OSError, ValueError, git.exc.GitError) as e:
+            if not self.config["keep_going"]:
+                raise
+            result["status"], result["reason"] = "failed", str(e)
+        finally:
+            progress.finish(handler)
+
+        if result["status"] != "ok" and not result["reason"]:
+            result["reason"] = SKIP_REASONS.get(result["status"], "")
+        if result["status"] == "ok":
+            values: dict[str, Any] = {"duration": round(time.monotonic() - start, 3)}
+            if size is not None:
+                values["size"] = size
+            if handler is not None and handler.bytes:
+                values["transfer"] = handler.bytes
+            self.history.update(history_key(repo), **values)
+        return result
+
+    def _use_worktree(self, repo: dict[str, Any]) -> bool:
+        # Worktrees always span the whole repository
+        return bool(self.config["publish"] == "worktree" and not repo["path"])
+
+    def _manifest_hit(self, repo: dict[str, Any]) -> bool:
+        if not repo["pinned"] or not os.path.isdir(repo["dest"]):
+            return False
+
+        entry = self.manifest.get(repo["dest"])
+        return (
+            entry.get("url") == repo["url"]
+            and entry.get("path") == str(repo["path"] or "")
+            and entry.get("ref") == repo["branch"]
+            and entry.get("ref_type") == repo["ref_type"]
+            and entry.get("submodules", False) == self.config["submodules"]
+            and entry.get("publish") == self._publish_mode(repo)
+        )
+
+    def _manifest_update(self, repo: dict[str, Any], commit: str) -> None:
+        self.manifest.update(
+            repo["dest"],
+            url=repo["url"],
+            ref=repo["branch"],
+            ref_type=repo["ref_type"],
+            path=str(repo["path"] or ""),
+            commit=commit,
+            submodules=self.config["submodules"],
+            publish=self._publish_mode(repo),
+        )
+
+    def _publish_mode(self, repo: dict[str, Any]) -> str:
+        return "worktree" if self._use_worktree(repo) else str(self.config["publish"])
+
+    def _repo_checkout(
+        self, repo: dict[str, Any], workdir: str, progress: RepoProgress | None = None
+    ) -> str:
+        if self.cache is not None:
+            commit = self.cache.update(
+                repo["url"], repo["branch"], repo["ref_type"], progress=progress
+            )
+            clone = self.cache.checkout(repo["url"], commit, workdir)
+        elif repo["ref_type"] == "commit":
+            # Commits can not be cloned by name, fetch the single commit instead
+            clone = git.Repo.init(workdir, mkdir=True)
+            clone.create_remote("origin", repo["url"])
+            refs.fetch(clone, "--depth=1", "origin", repo["branch"], progress=progress)
+            refs.checkout(clone, repo["branch"])
+            commit = repo["branch"]
+        else:
+            options = ["--branch={}".format(repo["branch"]), "--single-branch"]
+            clone = git.Repo.clone_from(
+                repo["url"],
+                workdir,
+                multi_options=options,
+                progress=progress,  # type: ignore[arg-type]
+            )
+            commit = clone.head.commit.hexsha
+
+        if self.config["submodules"]:
+            self._repo_submodules(clone)
+        return str(commit)
+
+    def _repo_submodules(self, clone: git.Repo) -> None:
+        direct = []
+        cached = []
+        try:
+            for module in submodules.list_submodules(clone):
+                if self._submodule_cached(module["url"]):
+                    cached.append(module)
+                else:
+                    direct.append(module["path"])
+
+            submodules.update(clone, direct, jobs=self.config["submodule_jobs"])
+        except git.exc.GitCommandError as e:
+            self._submodule_error(direct, e)
+        if cached:
+            with ThreadPoolExecutor(max_workers=self.config["submodule_jobs"]) as pool:
+                for future in [pool.submit(self._submodule_checkout, clone, m) for m in cached]:
+                    future.result()
+
+    def _submodule_cached(self, url: str) -> bool:
+        # Cache submodules that are listed, were seen before or are cached already
+        if self.cache is None:
+            return False
+
+        key = submodules.normalize_url(url)
+        with self._submodule_lock:
+            seen = key in self._submodule_urls
+            self._submodule_urls.add(key)
+
+        return (
+            seen
+            or key in self._listed_urls
+            or os.path.isdir(self.cache.path(self._listed_urls.get(key, url)))
+        )
+
+    def _submodule_checkout(self, clone: git.Repo, module: dict[str, Any]) -> None:
+        if self.cache is None or clone.working_tree_dir is None:
+            return
+
+        url = self._listed_urls.get(submodules.normalize_url(module["url"]), module["url"])
+        try:
+            commit = self.cache.update(url, module["commit"], "commit")
+            checkout = self.cache.checkout(
+                url, commit, os.path.join(clone.working_tree_dir, module["path"])
+            )
+        except git.exc.GitCommandError as e:
+            self._submodule_error([module["path"]], e)
+            return
+        self._repo_submodules(checkout)
+
+    def _submodule_error(self, paths: list[str], e: git.exc.GitCommandError) -> None:
+        # A missing submodule commit is never a missing ref of the entry itself
+        err = [x.split(":", 1)[-1].strip() for x in self._clone_errors(e)]
+        names = ", ".join(f"'{path}'" for path in paths)
+        self._fail("failed", "Unable to check out submodule {}: {}".format(names, "\n".join(err)))
+
+    def _repo_worktree(self, repo: dict[str, Any], progress: RepoProgress | None = None) -> str:
+        if self.cache is None:
+            raise ValueError("Worktrees require the repository cache")
+
+        try:
+            commit = self.cache.update(
+                repo["url"], repo["branch"], repo["ref_type"], progress=progress
+            )
+            self.manifest.remove(repo["dest"])
+            worktree = self.cache.worktree(repo["url"], commit, repo["dest"])
+            if self.config["submodules"]:
+                self._repo_submodules(worktree)
+        except git.exc.GitCommandError as e:
+            return self._git_error_handler(e, repo, progress)
+        except FileExistsError:
+            return self._file_exist_handler()
+
+        self._manifest_update(repo, commit)
+        return "ok"
+
+    def _repo_clone(
+        self, repo: dict[str, Any], progress: RepoProgress | None = None
+    ) -> tuple[str, int | None]:
+        status = "ok"
+        size = None
+        rename = self.config["publish"] == "rename"
+        staging_dir = self.config["staging_dir"]
+        if rename:
+            # Renames are only atomic within the same filesystem
+            staging_dir = os.path.dirname(repo["dest"])
+            os.makedirs(staging_dir, 0o750, exist_ok=True)
+
+        prefix = ".gitbatch_" if rename else "gitbatch_"
+        with tempfile.TemporaryDirectory(prefix=prefix, dir=staging_dir) as tmp:
+            workdir = os.path.join(tmp, "tree")
+            try:
+                commit = self._repo_checkout(repo, workdir, progress)
+                if self.config["disk_budget"] is not None:
+                    size = tree_size(tmp)
+                if not rename:
                     os.makedirs(repo["dest"], 0o750, self.config["ignore_existing"])
-                except git.exc.GitCommandError as e:
-                    skip = False
-                    err_raw = e.stderr.strip().splitlines()[:-1]
-                    err = [
-                        x.split(":", 1)[1].strip().replace(repo["dest"], repo["rel_dest"])
-                        for x in err_raw
-                    ]
-
-                    if (
-                        any("could not find remote branch" in item for item in err)
-                        and self.config["ignore_missing"]
-                    ):
-                        skip = True
-                    if not skip:
-                        self.log.sysexit_with_message("Error: {}".format("\n".join(err)))
-                except FileExistsError:
-                    self._file_exist_handler()
-
-                try:
-                    path = tmp
-                    if repo["path"]:
-                        normalized_path = normalize_path(os.path.join(tmp, repo["path"]))
-                        if normalized_path is None:
-                            raise ValueError(f"Invalid path: {repo['path']}")
-                        path = normalized_path
-                        if not os.path.isdir(path):
-                            raise FileNotFoundError(Path(path).relative_to(tmp))
+            except git.exc.GitCommandError as e:
+                return self._git_error_handler(e, repo, progress), size
+            except FileExistsError:
+                status = self._file_exist_handler()
 
+            try:
+                path = workdir
+                if repo["path"]:
+                    normalized_path = normalize_path(os.path.join(workdir, repo["path"]))
+                    if normalized_path is None:
+                        raise ValueError(f"Invalid path: {repo['path']}")
+                    path = normalized_path
+                    if not os.path.isdir(path):
+                        raise FileNotFoundError(Path(path).relative_to(workdir))
+
+                worktree = self.manifest.get(repo["dest"]).get("publish") == "worktree"
+                self.manifest.remove(repo["dest"])
+                if rename:
+                    staging.publish_tree(path, repo["dest"], self.config["ignore_existing"])
+                else:
+                    if worktree:
+                        # Turn a former worktree into a plain copy, git prunes it later
+                        staging.strip_git(repo["dest"])
                     copy.simple_copy_tree(
                         path,
                         repo["dest"],
                         ignore=ignore_patterns(".git"),
                         dirs_exist_ok=self.config["ignore_existing"],
                     )
-                except FileExistsError:
-                    self._file_exist_handler()
-                except FileNotFoundError as e:
-                    self.log.sysexit_with_message(
-                        "Error: directory '{}' not found in repository '{}'".format(
-                            e, repo["name"]
-                        )
-                    )
+                self._manifest_update(repo, commit)
+            except FileExistsError:
+                status = self._file_exist_handler()
+            except FileNotFoundError as e:
+                self._fail(
+                    "failed",
+                    "directory '{}' not found in repository '{}'".format(e, repo["name"]),
+                )
+
+        return status, size
 
-    def _file_exist_handler(self) -> None:
+    def _clone_errors(
+        self, e: git.exc.GitCommandError, progress: RepoProgress | None = None
+    ) -> list[str]:
+        # A progress handler consumes stderr, so the exception carries no output
+        if progress is not None and not str(e.stderr).strip():
+            lines = progress.lines
+        else:
+            # Unwrap the "stderr: '...'" formatting of GitCommandError
+            lines = str(e.stderr).strip().removeprefix("stderr: '").removesuffix("'").splitlines()
+
+        return [x for x in lines if x.strip() and not x.startswith("Cloning into")]
+
+    def _git_error_handler(
+        self,
+        e: git.exc.GitCommandError,
+        repo: dict[str, Any],
+        progress: RepoProgress | None = None,
+    ) -> str:
+        skip = False
+        err = [
+            x.split(":", 1)[-1].strip().replace(repo["dest"], repo["rel_dest"])
+            for x in self._clone_errors(e, progress)
+        ]
+
+        missing = any(pattern in item.lower() for item in err for pattern in MISSING_REF_PATTERNS)
+        if missing and self.config["ignore_missing"]:
+            skip = True
+        if not skip:
+            self._fail("missing-branch" if missing else "failed", "\n".join(err))
+        return "missing-branch"
+
+    def _file_exist_handler(self) -> str:
         skip = False
         err = ["directory already exists"]
 
@@ -160,13 +743,25 @@ class GitBatch:
             self.logger.warning("Error: {}".format("\n".join(err)))
             skip = True
         if not skip:
-            self.log.sysexit_with_message("Error: {}".format("\n".join(err)))
+            self._fail("skipped-existing", "\n".join(err))
+        return "skipped-existing"
+
+    def _fail(self, status: str, reason: str) -> None:
+        if self.config["keep_going"]:
+            self.logger.error(f"Error: {reason}")
+            raise EntryError(status, reason)
+
+        self.log.sysexit_with_message(f"Error: {reason}")
 
     def run(self) -> None:
         self.log.set_level(self.config["logging"]["level"])
         if os.path.isfile(self.config["input_file"]):
+            if self.config["check"]:
+                self._repos_check(self.config["input_file"])
+                return
+
             repos = self._repos_from_file(self.config["input_file"])
-            self._repos_clone(repos)
+            self._repos_clone(self._repos_shard(repos))
         else:
             self.log.sysexit_with_message(
                 "The given batch file at '{}' does not exist".format(
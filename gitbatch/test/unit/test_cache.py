@@ -0,0 +1,109 @@
+import shutil
+from pathlib import Path
+
+import git
+import pytest
+
+from gitbatch.utils.cache import RepoCache
+
+
+@pytest.fixture
+def remote(tmp_path: Path) -> git.Repo:
+    """Create a local repository with a single tagged commit."""
+    repo = git.Repo.init(tmp_path / "remote", initial_branch="main")
+    (tmp_path / "remote" / "file.txt").write_text("content")
+    repo.index.add(["file.txt"])
+    repo.index.commit("initial")
+    repo.create_tag("v1")
+    return repo
+
+
+def test_cache_path(tmp_path: Path) -> None:
+    """Test that cache paths are stable per URL."""
+    cache = RepoCache(str(tmp_path))
+    path = cache.path("https://example.com/group/repo.git")
+
+    assert path == cache.path("https://example.com/group/repo.git")
+    assert path != cache.path("https://example.com/other/repo.git")
+    assert Path(path).name.startswith("repo-")
+
+
+def test_cache_update_and_checkout(tmp_path: Path, remote: git.Repo) -> None:
+    """Test that refs are fetched once and checked out from the cache."""
+    cache = RepoCache(str(tmp_path / "cache"))
+    url = str(tmp_path / "remote")
+    sha = remote.head.commit.hexsha
+
+    assert cache.resolve(url, "main", "branch") is None
+    assert cache.update(url, "main", "branch") == sha
+    assert cache.update(url, "v1", "tag") == sha
+
+    # Pinned refs resolve from the cache without the remote
+    shutil.rmtree(url)
+    assert cache.update(url, "v1", "tag") == sha
+    assert cache.update(url, sha, "commit") == sha
+
+    checkout = cache.checkout(url, sha, str(tmp_path / "checkout"))
+    assert checkout.head.commit.hexsha == sha
+    assert (tmp_path / "checkout" / "file.txt").read_text() == "content"
+
+    with pytest.raises(git.exc.GitCommandError):
+        cache.update(url, "main", "branch")
+
+
+def test_cache_update_bare_tag(tmp_path: Path, remote: git.Repo) -> None:
+    """Test that a branch name only existing as tag falls back to the tag."""
+    cache = RepoCache(str(tmp_path / "cache"))
+    url = str(tmp_path / "remote")
+
+    assert cache.update(url, "v1", "branch") == remote.head.commit.hexsha
+    assert cache.resolve(url, "v1", "tag") == remote.head.commit.hexsha
+
+    with pytest.raises(git.exc.GitCommandError, match="refs/heads/v2"):
+        cache.update(url, "v2", "branch")
+
+
+def test_cache_update_failed(tmp_path: Path, remote: git.Repo) -> None:
+    """Test that a failed first fetch does not leave an empty repository behind."""
+    cache = RepoCache(str(tmp_path / "cache"))
+    url = str(tmp_path / "remote")
+
+    with pytest.raises(git.exc.GitCommandError):
+        cache.update(url, "missing", "branch")
+    assert not Path(cache.path(url)).exists()
+
+    with pytest.raises(git.exc.GitCommandError):
+        cache.update(str(tmp_path / "unknown"), "main", "branch")
+    assert not Path(cache.path(str(tmp_path / "unknown"))).exists()
+
+    # Failures on an existing cache keep the fetched objects
+    cache.update(url, "main", "branch")
+    with pytest.raises(git.exc.GitCommandError):
+        cache.update(url, "missing", "branch")
+    assert cache.resolve(url, "main", "branch") == remote.head.commit.hexsha
+
+
+def test_cache_worktree(tmp_path: Path, remote: git.Repo) -> None:
+    """Test that destinations are materialized and updated as worktrees."""
+    cache = RepoCache(str(tmp_path / "cache"))
+    url = str(tmp_path / "remote")
+    dest = tmp_path / "dest" / "repo"
+    first = cache.update(url, "main", "branch")
+
+    worktree = cache.worktree(url, first, str(dest))
+    assert worktree.head.commit.hexsha == first
+    assert cache.is_worktree(url, str(dest))
+    assert (dest / "file.txt").read_text() == "content"
+
+    (tmp_path / "remote" / "file.txt").write_text("changed")
+    remote.index.add(["file.txt"])
+    second = remote.index.commit("update").hexsha
+
+    assert cache.update(url, "main", "branch") == second
+    assert cache.worktree(url, second, str(dest)).head.commit.hexsha == second
+    assert (dest / "file.txt").read_text() == "changed"
+
+    (tmp_path / "plain").mkdir()
+    assert not cache.is_worktree(url, str(tmp_path / "plain"))
+    with pytest.raises(FileExistsError):
+        cache.worktree(url, second, str(tmp_path / "plain"))
@@ -1,13 +1,23 @@
+import json
 import os
+import shutil
+import time
+from typing import Any
+import git
 import pytest
 from unittest.mock import patch, MagicMock
 from pathlib import Path
 
 from gitbatch.cli import GitBatch
+from gitbatch.utils.cache import RepoCache
+from gitbatch.utils.history import history_key
+from gitbatch.utils.progress import RepoProgress
+from gitbatch.utils.summary import EntryError
 
 @pytest.fixture
-def gitbatch_instance() -> GitBatch:
+def gitbatch_instance(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> GitBatch:
     """Create a GitBatch instance with run() method mocked to prevent execution."""
+    monkeypatch.setenv("GIT_BATCH_CACHE_DIR", str(tmp_path / "cache"))
     with patch("argparse.ArgumentParser.parse_args") as mock_parse_args, \
          patch.object(GitBatch, "run") as mock_run:
         mock_parse_args.return_value = MagicMock()
@@ -43,6 +53,53 @@ def test_config(gitbatch_instance: GitBatch) -> None:
         assert config["ignore_existing"] is True
         assert config["ignore_missing"] is False
 
+@pytest.mark.parametrize("value", ["x", "-1", "nan", "inf"])
+def test_config_progress_interval_invalid(
+    gitbatch_instance: GitBatch, monkeypatch: pytest.MonkeyPatch, value: str
+) -> None:
+    """Test that an invalid progress interval exits with a message."""
+    monkeypatch.setenv("GIT_BATCH_PROGRESS_INTERVAL", value)
+    with patch.object(gitbatch_instance.logger, "critical") as mock_critical, \
+         pytest.raises(SystemExit):
+        gitbatch_instance._config()
+    assert mock_critical.call_args.args[0].startswith(f"Invalid progress interval '{value}'")
+
+def test_config_progress_interval(
+    gitbatch_instance: GitBatch, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test that a valid progress interval is parsed."""
+    monkeypatch.setenv("GIT_BATCH_PROGRESS_INTERVAL", "0.5")
+    assert gitbatch_instance._config()["progress_interval"] == 0.5
+
+def test_config_jobs(gitbatch_instance: GitBatch, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that the number of jobs is parsed and validated."""
+    monkeypatch.setenv("GIT_BATCH_JOBS", "4")
+    assert gitbatch_instance._config()["jobs"] == 4
+    monkeypatch.setenv("GIT_BATCH_JOBS", "0")
+    assert gitbatch_instance._config()["jobs"] == 1
+
+    monkeypatch.setenv("GIT_BATCH_JOBS", "x")
+    with patch.object(gitbatch_instance.logger, "critical") as mock_critical, \
+         pytest.raises(SystemExit):
+        gitbatch_instance._config()
+    mock_critical.assert_called_once_with("Invalid GIT_BATCH_JOBS 'x', expected an integer")
+
+def test_config_submodule_jobs(
+    gitbatch_instance: GitBatch, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test that the number of submodule jobs is parsed and validated."""
+    assert gitbatch_instance._config()["submodule_jobs"] == 4
+    monkeypatch.setenv("GIT_BATCH_SUBMODULE_JOBS", "8")
+    assert gitbatch_instance._config()["submodule_jobs"] == 8
+
+    monkeypatch.setenv("GIT_BATCH_SUBMODULE_JOBS", "1.5")
+    with patch.object(gitbatch_instance.logger, "critical") as mock_critical, \
+         pytest.raises(SystemExit):
+        gitbatch_instance._config()
+    mock_critical.assert_called_once_with(
+        "Invalid GIT_BATCH_SUBMODULE_JOBS '1.5', expected an integer"
+    )
+
 def test_repos_from_file(tmp_path: Path, gitbatch_instance: GitBatch) -> None:
     """Test that repositories are correctly parsed from a file."""
     # Create a test file
@@ -60,6 +117,24 @@ def test_repos_from_file(tmp_path: Path, gitbatch_instance: GitBatch) -> None:
     assert repos[0]["dest"].endswith("dest")
     assert repos[0]["name"] == "repo.git"
 
+def test_repos_from_file_pinned(tmp_path: Path, gitbatch_instance: GitBatch) -> None:
+    """Test that tags and commits are parsed as immutable pins."""
+    sha = "0123456789abcdef0123456789abcdef01234567"
+    test_file = tmp_path / "test_repos.txt"
+    test_file.write_text(
+        "https://github.com/example/repo.git;;./a\n"
+        "https://github.com/example/repo.git;refs/tags/v1.0;./b\n"
+        f"https://github.com/example/repo.git;{sha}:subdir;./c\n"
+    )
+
+    repos = gitbatch_instance._repos_from_file(str(test_file))
+    assert [(r["branch"], r["ref_type"], r["pinned"]) for r in repos] == [
+        ("main", "branch", False),
+        ("v1.0", "tag", True),
+        (sha, "commit", True),
+    ]
+    assert repos[2]["path"] == Path("subdir")
+
 def test_repos_from_file_empty(tmp_path: Path, gitbatch_instance: GitBatch) -> None:
     """Test that empty lines are skipped."""
     # Create an empty file
@@ -87,6 +162,436 @@ def test_repos_from_file_invalid_format(tmp_path: Path, gitbatch_instance: GitBa
     with pytest.raises(SystemExit):
         gitbatch_instance._repos_from_file(str(test_file))
 
+def test_repos_from_file_index(tmp_path: Path, gitbatch_instance: GitBatch) -> None:
+    """Test that parsed entries are reused from the compiled index."""
+    test_file = tmp_path / "test_repos.txt"
+    test_file.write_text("https://github.com/example/repo.git;main:subdir;./dest\n")
+
+    repos = gitbatch_instance._repos_from_file(str(test_file))
+    with patch.object(GitBatch, "_repo_from_line") as mock_parse:
+        assert gitbatch_instance._repos_from_file(str(test_file)) == repos
+        mock_parse.assert_not_called()
+
+    test_file.write_text("https://github.com/example/other.git;main;./dest\n")
+    assert gitbatch_instance._repos_from_file(str(test_file))[0]["name"] == "other.git"
+
+def test_repos_check(tmp_path: Path, gitbatch_instance: GitBatch) -> None:
+    """Test that check mode reports all problems at once."""
+    test_file = tmp_path / "check.txt"
+    test_file.write_text(
+        "https://github.com/example/repo.git;main;./dest\n"
+        "invalid;format\n"
+        "https://github.com/example/repo.git;main;./dest\n"
+    )
+
+    with patch.object(gitbatch_instance.logger, "error") as mock_error, \
+         pytest.raises(SystemExit):
+        gitbatch_instance._repos_check(str(test_file))
+
+    assert [c.args[0] for c in mock_error.call_args_list] == [
+        "Error: Wrong number of delimiters in line 2: "
+        "not enough values to unpack (expected 3, got 2)",
+        "Error: Duplicate entry in line 3, same destination as line 1",
+    ]
+
+def test_repos_invalid_utf8(tmp_path: Path, gitbatch_instance: GitBatch) -> None:
+    """Test that check mode and a real run both reject invalid UTF-8."""
+    test_file = tmp_path / "latin1.txt"
+    test_file.write_bytes(
+        b"https://github.com/example/repo.git;main;./dest\n"
+        b"https://github.com/example/repo.git;main;./d\xe9st\n"
+        b"invalid;format\n"
+    )
+
+    with patch.object(gitbatch_instance.logger, "error") as mock_error, \
+         pytest.raises(SystemExit):
+        gitbatch_instance._repos_check(str(test_file))
+
+    assert [c.args[0] for c in mock_error.call_args_list] == [
+        "Error: Invalid UTF-8 in line 2: invalid continuation byte",
+        "Error: Wrong number of delimiters in line 3: "
+        "not enough values to unpack (expected 3, got 2)",
+    ]
+
+    with patch.object(gitbatch_instance.logger, "critical") as mock_critical, \
+         pytest.raises(SystemExit):
+        gitbatch_instance._repos_from_file(str(test_file))
+    mock_critical.assert_called_once_with("Invalid UTF-8 in line 2: invalid continuation byte")
+
+def test_repos_shard_weights_invalid(tmp_path: Path, gitbatch_instance: GitBatch) -> None:
+    """Test that a missing or corrupt weights file aborts instead of changing the partition."""
+    repos = [{"url": "https://github.com/example/repo.git", "branch": "main", "path": None}]
+    gitbatch_instance.config["shard"] = (1, 2)
+
+    weights = tmp_path / "weights.json"
+    gitbatch_instance.config["shard_weights"] = str(weights)
+    with pytest.raises(SystemExit):
+        gitbatch_instance._repos_shard(repos)
+
+    weights.write_text("{invalid")
+    with pytest.raises(SystemExit):
+        gitbatch_instance._repos_shard(repos)
+
+    weights.write_text("{}")
+    assert gitbatch_instance._repos_shard(repos) in ([], repos)
+
+@pytest.fixture
+def remote_url(tmp_path: Path) -> str:
+    """Create a bare repository with a main branch and a tag."""
+    work = git.Repo.init(tmp_path / "work", initial_branch="main")
+    (tmp_path / "work" / "file.txt").write_text("content")
+    work.index.add(["file.txt"])
+    work.index.commit("initial")
+    work.create_tag("v1")
+    git.Repo.clone_from(str(tmp_path / "work"), str(tmp_path / "remote.git"), bare=True)
+    return str(tmp_path / "remote.git")
+
+def _make_remote(tmp_path: Path, name: str, files: dict[str, str]) -> str:
+    work = git.Repo.init(tmp_path / f"{name}-work", initial_branch="main")
+    for path, content in files.items():
+        (tmp_path / f"{name}-work" / path).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / f"{name}-work" / path).write_text(content)
+    work.index.add(list(files))
+    work.index.commit("initial")
+    git.Repo.clone_from(str(tmp_path / f"{name}-work"), str(tmp_path / f"{name}.git"), bare=True)
+    return str(tmp_path / f"{name}.git")
+
+def _write_batchfile(tmp_path: Path, *lines: str) -> str:
+    batchfile = tmp_path / "batchfile"
+    batchfile.write_text("".join(f"{line}\n" for line in lines))
+    return str(batchfile)
+
+def _mixed_batchfile(tmp_path: Path, remote_url: str) -> str:
+    out = tmp_path / "out"
+    return _write_batchfile(
+        tmp_path,
+        f"{remote_url};main;{out}/good",
+        f"{remote_url};missing;{out}/missing",
+        f"{tmp_path}/unknown.git;main;{out}/bad",
+        f"{remote_url};main;{out}/later",
+    )
+
+def test_repos_clone_keep_going(
+    tmp_path: Path,
+    remote_url: str,
+    gitbatch_instance: GitBatch,
+    capsys: pytest.CaptureFixture[str],
+) -> None:
+    """Test that failures become result rows and only fail the run at the end."""
+    summary = tmp_path / "summary.json"
+    gitbatch_instance.config["keep_going"] = True
+    gitbatch_instance.config["summary"] = str(summary)
+    repos = gitbatch_instance._repos_from_file(_mixed_batchfile(tmp_path, remote_url))
+
+    with pytest.raises(SystemExit) as excinfo:
+        gitbatch_instance._repos_clone(repos)
+    assert excinfo.value.code == 1
+
+    # The entry after the failure still ran
+    assert (tmp_path / "out" / "good" / "file.txt").read_text() == "content"
+    assert (tmp_path / "out" / "later" / "file.txt").read_text() == "content"
+    assert not (tmp_path / "out" / "missing").exists()
+
+    data = json.loads(summary.read_text())
+    assert [r["status"] for r in data["results"]] == ["ok", "missing-branch", "failed", "ok"]
+    assert "unknown.git' does not exist" in data["results"][2]["reason"]
+    assert data["counts"] == {"ok": 2, "skipped-existing": 0, "missing-branch": 1, "failed": 1}
+
+    table = capsys.readouterr().out
+    assert table.splitlines()[0].split() == ["STATUS", "NAME", "REF", "DEST", "REASON"]
+    assert len(table.splitlines()) == 5
+
+def test_repos_clone_summary_stdout(
+    tmp_path: Path,
+    remote_url: str,
+    gitbatch_instance: GitBatch,
+    capsys: pytest.CaptureFixture[str],
+) -> None:
+    """Test that the JSON summary is written to stdout and a clean run exits normally."""
+    gitbatch_instance.config["summary"] = "-"
+    repos = gitbatch_instance._repos_from_file(
+        _write_batchfile(
+            tmp_path,
+            f"{remote_url};main;{tmp_path}/out/good",
+            f"{remote_url};missing;{tmp_path}/out/missing",
+        )
+    )
+
+    gitbatch_instance._repos_clone(repos)
+
+    data = json.loads(capsys.readouterr().out)
+    assert [r["status"] for r in data["results"]] == ["ok", "missing-branch"]
+    assert data["results"][1]["reason"] == "remote ref not found"
+
+def test_repos_clone_fail_fast(
+    tmp_path: Path, remote_url: str, gitbatch_instance: GitBatch
+) -> None:
+    """Test that without keep-going the first failure stops the run."""
+    repos = gitbatch_instance._repos_from_file(_mixed_batchfile(tmp_path, remote_url))
+
+    with pytest.raises(SystemExit):
+        gitbatch_instance._repos_clone(repos)
+
+    assert (tmp_path / "out" / "good").exists()
+    assert not (tmp_path / "out" / "later").exists()
+
+def test_repos_clone_manifest(
+    tmp_path: Path, remote_url: str, gitbatch_instance: GitBatch
+) -> None:
+    """Test that pinned entries already in place are skipped on the next run."""
+    out = tmp_path / "out"
+    gitbatch_instance.config["ignore_existing"] = True
+    gitbatch_instance.config["summary"] = str(tmp_path / "summary.json")
+    batchfile = _write_batchfile(
+        tmp_path, f"{remote_url};refs/tags/v1;{out}/tag", f"{remote_url};main;{out}/branch"
+    )
+
+    gitbatch_instance._repos_clone(gitbatch_instance._repos_from_file(batchfile))
+    repos = gitbatch_instance._repos_from_file(batchfile)
+    assert gitbatch_instance._manifest_hit(repos[0])
+    assert not gitbatch_instance._manifest_hit(repos[1])
+
+    gitbatch_instance._repos_clone(repos)
+    results = json.loads((tmp_path / "summary.json").read_text())["results"]
+    assert [r["reason"] for r in results] == ["already at v1", ""]
+
+    # Any change of the entry, the publish mode or the destination invalidates the manifest
+    gitbatch_instance.config["publish"] = "worktree"
+    assert not gitbatch_instance._manifest_hit(repos[0])
+    gitbatch_instance.config["publish"] = "copy"
+    gitbatch_instance.config["submodules"] = True
+    assert not gitbatch_instance._manifest_hit(repos[0])
+    gitbatch_instance.config["submodules"] = False
+    assert not gitbatch_instance._manifest_hit({**repos[0], "url": f"{remote_url}/"})
+    shutil.rmtree(out / "tag")
+    assert not gitbatch_instance._manifest_hit(repos[0])
+
+def test_repos_clone_manifest_publish_mode(
+    tmp_path: Path, remote_url: str, gitbatch_instance: GitBatch
+) -> None:
+    """Test that switching the publish mode republishes pinned entries."""
+    dest = tmp_path / "out" / "tag"
+    batchfile = _write_batchfile(tmp_path, f"{remote_url};refs/tags/v1;{dest}")
+    gitbatch_instance.config["ignore_existing"] = True
+    gitbatch_instance._repos_clone(gitbatch_instance._repos_from_file(batchfile))
+    assert not (dest / ".git").exists()
+
+    shutil.rmtree(dest)
+    gitbatch_instance.config["publish"] = "worktree"
+    gitbatch_instance.cache = RepoCache(str(tmp_path / "cache" / "repos"))
+    gitbatch_instance._repos_clone(gitbatch_instance._repos_from_file(batchfile))
+    assert (dest / ".git").is_file()
+
+    gitbatch_instance.config["publish"] = "worktree"
+    repos = gitbatch_instance._repos_from_file(batchfile)
+    assert gitbatch_instance._manifest_hit(repos[0])
+
+    gitbatch_instance.config["publish"] = "copy"
+    assert not gitbatch_instance._manifest_hit(repos[0])
+    gitbatch_instance._repos_clone(repos)
+    assert not (dest / ".git").exists()
+    assert (dest / "file.txt").read_text() == "content"
+    assert gitbatch_instance._manifest_hit(repos[0])
+
+@pytest.mark.parametrize("publish", ["copy", "worktree"])
+def test_repos_clone_cache_bare_tag(
+    tmp_path: Path, remote_url: str, gitbatch_instance: GitBatch, publish: str
+) -> None:
+    """Test that a bare tag name is checked out from the cache like a direct clone."""
+    gitbatch_instance.config["publish"] = publish
+    gitbatch_instance.config["summary"] = str(tmp_path / "summary.json")
+    gitbatch_instance.cache = RepoCache(str(tmp_path / "cache" / "repos"))
+    repos = gitbatch_instance._repos_from_file(
+        _write_batchfile(tmp_path, f"{remote_url};v1;{tmp_path}/out/tag")
+    )
+
+    gitbatch_instance._repos_clone(repos)
+
+    results = json.loads((tmp_path / "summary.json").read_text())["results"]
+    assert [r["status"] for r in results] == ["ok"]
+    assert (tmp_path / "out" / "tag" / "file.txt").read_text() == "content"
+
+def test_repos_clone_overlapping_dests(
+    tmp_path: Path, gitbatch_instance: GitBatch, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test that entries with overlapping destinations run in batchfile order."""
+    first = _make_remote(tmp_path, "first", {"f": "a"})
+    second = _make_remote(tmp_path, "second", {"f": "b"})
+    other = _make_remote(tmp_path, "other", {"f": "c"})
+    out = tmp_path / "out"
+    repos = gitbatch_instance._repos_from_file(
+        _write_batchfile(
+            tmp_path,
+            f"{first};main;{out}/dest",
+            f"{other};main;{out}/other",
+            f"{second};main;{out}/dest",
+            f"{other};main;{out}/dest/nested",
+        )
+    )
+
+    events = []
+    repo_clone = GitBatch._repo_clone
+
+    def slow_clone(self: GitBatch, repo: dict[str, Any], progress: Any = None) -> Any:
+        events.append(("start", repo["index"]))
+        # Without ordering the slow first entry would be published last
+        if repo["index"] == 0:
+            time.sleep(0.5)
+        result = repo_clone(self, repo, progress)
+        events.append(("end", repo["index"]))
+        return result
+
+    monkeypatch.setattr(GitBatch, "_repo_clone", slow_clone)
+    gitbatch_instance.config["jobs"] = 3
+    gitbatch_instance.config["ignore_existing"] = True
+    gitbatch_instance._repos_clone(repos)
+
+    assert (out / "dest" / "f").read_text() == "b"
+    assert (out / "dest" / "nested" / "f").read_text() == "c"
+    assert events.index(("end", 0)) < events.index(("start", 2))
+    assert events.index(("end", 2)) < events.index(("start", 3))
+    # Unrelated entries are not held back
+    assert events.index(("start", 1)) < events.index(("end", 0))
+
+def _add_submodule(repo: git.Repo, url: str, path: str) -> None:
+    repo.git.execute(
+        ["git", "-c", "protocol.file.allow=always", "submodule", "add", "--quiet", url, path]
+    )
+    repo.index.commit(f"add {path}")
+
+@pytest.fixture
+def superproject(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> dict[str, str]:
+    """Create a superproject with a submodule that has a nested submodule."""
+    monkeypatch.setenv("GIT_CONFIG_COUNT", "1")
+    monkeypatch.setenv("GIT_CONFIG_KEY_0", "protocol.file.allow")
+    monkeypatch.setenv("GIT_CONFIG_VALUE_0", "always")
+
+    inner = _make_remote(tmp_path, "inner", {"inner.txt": "inner"})
+    _make_remote(tmp_path, "lib", {"lib.txt": "lib"})
+    lib_work = git.Repo(tmp_path / "lib-work")
+    _add_submodule(lib_work, inner, "inner")
+    lib_work.git.push(str(tmp_path / "lib.git"), "main")
+
+    super_url = _make_remote(tmp_path, "super", {"super.txt": "super"})
+    super_work = git.Repo(tmp_path / "super-work")
+    _add_submodule(super_work, str(tmp_path / "lib.git"), "deps/lib")
+    super_work.git.push(super_url, "main")
+
+    # Point a second branch at a submodule commit that was never pushed
+    super_work.git.checkout("-b", "broken")
+    module = git.Repo(tmp_path / "super-work" / "deps" / "lib")
+    (tmp_path / "super-work" / "deps" / "lib" / "local.txt").write_text("local")
+    module.index.add(["local.txt"])
+    module.index.commit("unpushed")
+    super_work.git.add("deps/lib")
+    super_work.index.commit("unpushed submodule")
+    super_work.git.push(super_url, "broken")
+
+    return {"super": super_url, "lib": str(tmp_path / "lib.git")}
+
+@pytest.mark.parametrize("cache", [False, True])
+def test_repos_clone_submodules(
+    tmp_path: Path, superproject: dict[str, str], gitbatch_instance: GitBatch, cache: bool
+) -> None:
+    """Test that submodules are checked out recursively, directly and from the cache."""
+    out = tmp_path / "out"
+    gitbatch_instance.config["submodules"] = True
+    if cache:
+        gitbatch_instance.cache = RepoCache(str(tmp_path / "cache" / "repos"))
+    lines = [f"{superproject['super']};main;{out}/super"]
+    if cache:
+        # Listed URLs are served from the cache when used as submodule
+        lines.append(f"{superproject['lib']};main;{out}/lib")
+
+    gitbatch_instance._repos_clone(
+        gitbatch_instance._repos_from_file(_write_batchfile(tmp_path, *lines))
+    )
+
+    assert (out / "super" / "super.txt").read_text() == "super"
+    assert (out / "super" / "deps" / "lib" / "lib.txt").read_text() == "lib"
+    assert (out / "super" / "deps" / "lib" / "inner" / "inner.txt").read_text() == "inner"
+    assert not (out / "super" / "deps" / "lib" / ".git").exists()
+    if gitbatch_instance.cache is not None:
+        assert os.path.isdir(gitbatch_instance.cache.path(superproject["lib"]))
+
+@pytest.mark.parametrize("cache", [False, True])
+def test_repos_clone_submodule_missing_commit(
+    tmp_path: Path, superproject: dict[str, str], gitbatch_instance: GitBatch, cache: bool
+) -> None:
+    """Test that an unreachable submodule commit fails the entry instead of skipping it."""
+    out = tmp_path / "out"
+    summary = tmp_path / "summary.json"
+    gitbatch_instance.config["submodules"] = True
+    gitbatch_instance.config["keep_going"] = True
+    gitbatch_instance.config["summary"] = str(summary)
+    if cache:
+        gitbatch_instance.cache = RepoCache(str(tmp_path / "cache" / "repos"))
+    lines = [
+        f"{superproject['super']};broken;{out}/broken",
+        f"{superproject['super']};main;{out}/super",
+    ]
+    if cache:
+        lines.append(f"{superproject['lib']};main;{out}/lib")
+    repos = gitbatch_instance._repos_from_file(_write_batchfile(tmp_path, *lines))
+
+    with pytest.raises(SystemExit):
+        gitbatch_instance._repos_clone(repos)
+
+    results = json.loads(summary.read_text())["results"]
+    assert results[0]["status"] == "failed"
+    assert "Unable to check out submodule 'deps/lib'" in results[0]["reason"]
+    assert not (out / "broken").exists()
+    assert all(r["status"] == "ok" for r in results[1:])
+
+    # Without keep-going the run stops right away
+    gitbatch_instance.config["keep_going"] = False
+    with pytest.raises(SystemExit):
+        gitbatch_instance._repos_clone(repos[:1])
+
+def test_repos_clone_history_order(
+    tmp_path: Path, gitbatch_instance: GitBatch, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test that history ordering starts long entries first but keeps overlapping ones in order."""
+    first = _make_remote(tmp_path, "first", {"f": "a"})
+    second = _make_remote(tmp_path, "second", {"f": "b"})
+    other = _make_remote(tmp_path, "other", {"f": "c"})
+    out = tmp_path / "out"
+    repos = gitbatch_instance._repos_from_file(
+        _write_batchfile(
+            tmp_path,
+            f"{first};main;{out}/dest",
+            f"{other};main;{out}/other",
+            f"{second};main;{out}/dest",
+        )
+    )
+    for repo, duration in zip(repos, [1, 5, 10], strict=True):
+        gitbatch_instance.history.update(history_key(repo), duration=duration)
+
+    events = []
+    handlers = []
+    repo_clone = GitBatch._repo_clone
+
+    def tracked_clone(self: GitBatch, repo: dict[str, Any], progress: Any = None) -> Any:
+        events.append(("start", repo["index"]))
+        handlers.append(progress)
+        result = repo_clone(self, repo, progress)
+        events.append(("end", repo["index"]))
+        return result
+
+    monkeypatch.setattr(GitBatch, "_repo_clone", tracked_clone)
+    gitbatch_instance.config["jobs"] = 2
+    gitbatch_instance.config["ignore_existing"] = True
+    gitbatch_instance._repos_clone(repos)
+
+    # The longest entry comes first in the history order but waits for the earlier one
+    assert {events[0], events[1]} <= {("start", 0), ("start", 1), ("end", 0), ("end", 1)}
+    assert events.index(("end", 0)) < events.index(("start", 2))
+    assert (out / "dest" / "f").read_text() == "b"
+
+    # Transferred bytes are counted for the history without progress output
+    assert gitbatch_instance.config["progress"] == "auto"
+    assert all(isinstance(handler, RepoProgress) for handler in handlers)
+
 def test_file_exist_handler(gitbatch_instance: GitBatch) -> None:
     """Test that file existence is handled correctly."""
     # Test with ignore_existing=True
@@ -101,6 +606,37 @@ def test_file_exist_handler(gitbatch_instance: GitBatch) -> None:
         gitbatch_instance._file_exist_handler()
         mock_log.assert_called_once()
 
+def test_file_exist_handler_keep_going(gitbatch_instance: GitBatch) -> None:
+    """Test that failures raise an entry error instead of exiting in keep-going mode."""
+    gitbatch_instance.config["ignore_existing"] = False
+    gitbatch_instance.config["keep_going"] = True
+    with patch.object(gitbatch_instance.log, "sysexit") as mock_log:
+        with pytest.raises(EntryError) as excinfo:
+            gitbatch_instance._file_exist_handler()
+        mock_log.assert_not_called()
+
+    assert excinfo.value.status == "skipped-existing"
+    assert excinfo.value.reason == "directory already exists"
+
+@pytest.mark.parametrize(
+    "status,ignore,failed",
+    [
+        ("ok", False, False),
+        ("failed", True, True),
+        ("missing-branch", True, False),
+        ("missing-branch", False, True),
+        ("skipped-existing", True, False),
+        ("skipped-existing", False, True),
+    ],
+)
+def test_result_failed(
+    gitbatch_instance: GitBatch, status: str, ignore: bool, failed: bool
+) -> None:
+    """Test that skipped entries only fail the run if they are not ignored."""
+    gitbatch_instance.config["ignore_existing"] = ignore
+    gitbatch_instance.config["ignore_missing"] = ignore
+    assert gitbatch_instance._result_failed({"status": status}) is failed
+
 def test_run(gitbatch_instance: GitBatch) -> None:
     """Test that run method executes correctly."""
     with patch("os.path.isfile") as mock_isfile:
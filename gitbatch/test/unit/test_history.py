@@ -0,0 +1,100 @@
+import json
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from gitbatch.utils.history import History, history_key, order_entries
+
+
+def test_history_key() -> None:
+    """Test that the history key covers url, branch and path."""
+    repo = {"url": "https://example.com/repo.git", "branch": "main", "path": Path("sub")}
+    assert history_key(repo) == "https://example.com/repo.git#main:sub"
+
+    repo["path"] = None
+    assert history_key(repo) == "https://example.com/repo.git#main:"
+
+
+def test_history_roundtrip(tmp_path: Path) -> None:
+    """Test that updates are persisted and loaded again."""
+    path = tmp_path / "cache" / "history.json"
+
+    history = History(str(path))
+    assert history.get("key") == {}
+    history.update("key", size=100)
+    history.update("key", duration=1.5)
+    history.save()
+
+    assert json.loads(path.read_text()) == {"key": {"size": 100, "duration": 1.5}}
+    assert History(str(path)).get("key") == {"size": 100, "duration": 1.5}
+
+
+def test_history_invalid_file(tmp_path: Path) -> None:
+    """Test that a corrupt history file is ignored."""
+    path = tmp_path / "history.json"
+    path.write_text("{invalid")
+
+    history = History(str(path))
+    assert history.get("key") == {}
+
+    # Nothing changed, so the file is left alone
+    history.save()
+    assert path.read_text() == "{invalid"
+
+
+def test_history_strict(tmp_path: Path) -> None:
+    """Test that strict loading fails on missing and invalid files."""
+    path = tmp_path / "history.json"
+    with pytest.raises(FileNotFoundError):
+        History(str(path), strict=True)
+
+    path.write_text("[]")
+    with pytest.raises(ValueError):
+        History(str(path), strict=True)
+
+    path.write_text('{"key": {"duration": 1}}')
+    assert History(str(path), strict=True).get("key") == {"duration": 1}
+
+
+def _entries(*names: str) -> list[dict[str, Any]]:
+    return [
+        {"url": f"https://example.com/{n}.git", "branch": "main", "path": None, "dest": f"/out/{n}"}
+        for n in names
+    ]
+
+
+def test_order_entries_without_history(tmp_path: Path) -> None:
+    """Test that entries keep batchfile order without any history."""
+    repos = _entries("a", "b", "c")
+    ordered = order_entries(repos, History(str(tmp_path / "history.json")), jobs=2)
+    assert [r["url"] for r in ordered] == [r["url"] for r in repos]
+
+
+def test_order_entries_longest_first(tmp_path: Path) -> None:
+    """Test that long entries start first, interleaved with short ones."""
+    repos = _entries("a", "b", "c", "d", "e", "f")
+    history = History(str(tmp_path / "history.json"))
+    for repo, duration in zip(repos, [1, 50, 2, 40, 30, 3], strict=True):
+        history.update(history_key(repo), duration=duration)
+
+    def names(jobs: int) -> str:
+        ordered = order_entries(repos, history, jobs=jobs)
+        return "".join(r["url"].split("/")[-1][0] for r in ordered)
+
+    # A single worker can not finish earlier, so the batchfile order is kept
+    assert names(1) == "abcdef"
+    assert names(2) == "bdaefc"
+    assert names(3) == "bdeafc"
+
+
+def test_order_entries_unknown_as_mean(tmp_path: Path) -> None:
+    """Test that entries without history count as the mean duration."""
+    repos = _entries("a", "b", "c")
+    history = History(str(tmp_path / "history.json"))
+    history.update(history_key(repos[0]), duration=1)
+    history.update(history_key(repos[2]), duration=9)
+
+    ordered = order_entries(repos, history, jobs=3)
+    assert [r["url"].split("/")[-1] for r in ordered] == ["c.git", "b.git", "a.git"]
+
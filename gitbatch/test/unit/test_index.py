@@ -0,0 +1,58 @@
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from gitbatch.utils.index import BatchIndex, find_conflicts, index_key
+
+
+def _repo(line: int, dest: str, url: str = "https://example.com/repo.git") -> dict[str, Any]:
+    return {"line": line, "url": url, "branch": "main", "path": None, "dest": dest}
+
+
+def test_index_key(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that the key covers content and referenced environment variables."""
+    content = b"https://example.com/repo.git;main;$DEST_ROOT/repo\n"
+    monkeypatch.setenv("DEST_ROOT", "/a")
+    monkeypatch.setenv("UNRELATED", "1")
+    key = index_key(content)
+
+    assert index_key(content) == key
+    assert index_key(content + b"\n") != key
+
+    monkeypatch.setenv("UNRELATED", "2")
+    assert index_key(content) == key
+
+    monkeypatch.setenv("DEST_ROOT", "/b")
+    assert index_key(content) != key
+
+
+def test_batch_index(tmp_path: Path) -> None:
+    """Test that entries are stored per batchfile and validated by key."""
+    index = BatchIndex(str(tmp_path / "index"))
+    repos = [{**_repo(1, "/dest"), "path": Path("sub")}, _repo(2, "/other")]
+
+    assert index.load("batchfile", "key") is None
+    index.save("batchfile", "key", repos)
+
+    assert index.load("batchfile", "key") == repos
+    assert index.load("batchfile", "other") is None
+    assert index.load("other", "key") is None
+
+
+def test_find_conflicts() -> None:
+    """Test that duplicate, conflicting and nested destinations are found."""
+    repos = [
+        _repo(1, "/out/a"),
+        _repo(2, "/out/b"),
+        _repo(3, "/out/a"),
+        _repo(4, "/out/b", url="https://example.com/other.git"),
+        _repo(5, "/out/a/nested/c"),
+        _repo(6, "/out/ab"),
+    ]
+
+    assert find_conflicts(repos) == [
+        "Duplicate entry in line 3, same destination as line 1",
+        "Conflicting entry in line 4, same destination as line 2",
+        "Destination of line 5 is inside the destination of line 1",
+    ]
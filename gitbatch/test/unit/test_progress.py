@@ -0,0 +1,142 @@
+import io
+import json
+from pathlib import Path
+
+import git
+import pytest
+
+from gitbatch.utils.progress import (
+    BatchProgress,
+    RepoProgress,
+    format_duration,
+    format_size,
+)
+
+
+@pytest.mark.parametrize(
+    "num,expected",
+    [
+        (512, "512.0 B"),
+        (2048, "2.0 KiB"),
+        (3 * 1024**2, "3.0 MiB"),
+    ],
+)
+def test_format_size(num: float, expected: str) -> None:
+    """Test that sizes are rendered with binary units."""
+    assert format_size(num) == expected
+
+
+@pytest.mark.parametrize(
+    "seconds,expected",
+    [
+        (None, "--:--"),
+        (65, "01:05"),
+        (3725, "1:02:05"),
+    ],
+)
+def test_format_duration(seconds: float | None, expected: str) -> None:
+    """Test that durations are rendered as clock values."""
+    assert format_duration(seconds) == expected
+
+
+def test_progress_off() -> None:
+    """Test that no handler is created and nothing is written when disabled."""
+    stream = io.StringIO()
+    progress = BatchProgress(2, mode="off", stream=stream)
+
+    assert progress.start("repo") is None
+    progress.finish(None)
+    progress.close()
+
+    assert progress.done == 1
+    assert stream.getvalue() == ""
+
+
+def test_progress_auto_without_tty() -> None:
+    """Test that auto mode is disabled on non-interactive streams."""
+    progress = BatchProgress(1, mode="auto", stream=io.StringIO())
+    assert progress.enabled is False
+
+
+def test_repo_progress_update() -> None:
+    """Test that receiving updates are parsed into objects and bytes."""
+    progress = BatchProgress(1, mode="json", interval=3600, stream=io.StringIO())
+    handler = progress.start("repo")
+    assert isinstance(handler, RepoProgress)
+
+    handler.update(RepoProgress.COUNTING, 10, 10, "")
+    assert handler.objects == 0
+
+    handler.update(RepoProgress.RECEIVING, 50, 100, "1.50 MiB | 2.00 MiB/s")
+    assert handler.objects == 50
+    assert handler.fraction == 0.5
+    assert handler.bytes == int(1.5 * 1024**2)
+
+
+def test_repo_progress_lines() -> None:
+    """Test that non-progress output keeps the order git wrote it in."""
+    handler = RepoProgress(BatchProgress(1), "repo")
+    parse = handler.new_message_handler()
+
+    parse("fatal: 'repo' does not appear to be a git repository")
+    parse("Receiving objects:  50% (1/2)")
+    parse("fatal: Could not read from remote repository.")
+    parse("")
+    parse("Please make sure you have the correct access rights")
+
+    assert handler.lines == [
+        "fatal: 'repo' does not appear to be a git repository",
+        "fatal: Could not read from remote repository.",
+        "",
+        "Please make sure you have the correct access rights",
+    ]
+
+
+def test_repo_progress_clone_errors(tmp_path: Path) -> None:
+    """Test that GitPython still routes the output of a failed clone through the handler."""
+    handler = RepoProgress(BatchProgress(1), "repo")
+    with pytest.raises(git.exc.GitCommandError):
+        git.Repo.clone_from(
+            str(tmp_path / "missing"),
+            str(tmp_path / "dest"),
+            progress=handler,  # type: ignore[arg-type]
+        )
+
+    assert any("does not exist" in line for line in handler.lines)
+
+
+def test_progress_json() -> None:
+    """Test that json mode emits machine-readable records."""
+    stream = io.StringIO()
+    progress = BatchProgress(2, mode="json", interval=3600, stream=stream)
+    handler = progress.start("repo-a")
+    assert handler is not None
+    handler.update(RepoProgress.RECEIVING, 10, 10, "1.00 KiB | 1.00 KiB/s")
+    progress.finish(handler)
+    progress.close()
+
+    records = [json.loads(line)["progress"] for line in stream.getvalue().splitlines()]
+    # First render happens on start, the rest are rate-limited until close
+    assert len(records) == 2
+    assert records[0]["active"] == ["repo-a"]
+    assert records[-1]["done"] == 1
+    assert records[-1]["total"] == 2
+    assert records[-1]["bytes"] == 1024
+    assert records[-1]["objects"] == 10
+    assert records[-1]["active"] == []
+    assert records[-1]["eta"] is not None
+
+
+def test_progress_tty() -> None:
+    """Test that tty mode redraws a single status line."""
+    stream = io.StringIO()
+    progress = BatchProgress(1, mode="tty", interval=0, stream=stream)
+    handler = progress.start("repo-a")
+    progress.finish(handler)
+    progress.close()
+
+    output = stream.getvalue()
+    assert output.startswith("\r\033[K[0/1]")
+    assert "repo-a" in output
+    assert output.endswith("\n")
+    assert "[1/1]" in output.splitlines()[-1]
@@ -0,0 +1,41 @@
+import pytest
+
+from gitbatch.utils.refs import is_pinned, parse_ref, ref_name, refspec
+
+SHA = "0123456789abcdef0123456789abcdef01234567"
+
+
+@pytest.mark.parametrize(
+    "ref,expected",
+    [
+        ("main", ("main", "branch")),
+        ("refs/heads/feature/x", ("feature/x", "branch")),
+        ("refs/tags/v1.0.0", ("v1.0.0", "tag")),
+        (SHA, (SHA, "commit")),
+        (SHA[:12], (SHA[:12], "branch")),
+    ],
+)
+def test_parse_ref(ref: str, expected: tuple[str, str]) -> None:
+    """Test that refs are split into name and type."""
+    assert parse_ref(ref) == expected
+
+
+def test_is_pinned() -> None:
+    """Test that only tags and commits are immutable pins."""
+    assert is_pinned("tag") is True
+    assert is_pinned("commit") is True
+    assert is_pinned("branch") is False
+
+
+@pytest.mark.parametrize(
+    "name,ref_type,expected_ref,expected_refspec",
+    [
+        ("main", "branch", "refs/heads/main", "+refs/heads/main:refs/heads/main"),
+        ("v1", "tag", "refs/tags/v1", "+refs/tags/v1:refs/tags/v1"),
+        (SHA, "commit", SHA, f"{SHA}:refs/pins/{SHA}"),
+    ],
+)
+def test_refspec(name: str, ref_type: str, expected_ref: str, expected_refspec: str) -> None:
+    """Test that refs are mapped to local refs of the same name."""
+    assert ref_name(name, ref_type) == expected_ref
+    assert refspec(name, ref_type) == expected_refspec
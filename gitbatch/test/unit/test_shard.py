@@ -0,0 +1,62 @@
+from typing import Any
+
+import pytest
+
+from gitbatch.utils.shard import parse_shard, shard_entries, shard_key
+
+
+def _repos(count: int) -> list[dict[str, Any]]:
+    return [{"url": f"https://example.com/repo{i}.git", "branch": "main"} for i in range(count)]
+
+
+@pytest.mark.parametrize(
+    "value,expected",
+    [
+        ("1/1", (1, 1)),
+        ("2/4", (2, 4)),
+    ],
+)
+def test_parse_shard(value: str, expected: tuple[int, int]) -> None:
+    """Test that valid shards are parsed."""
+    assert parse_shard(value) == expected
+
+
+@pytest.mark.parametrize("value", ["0/2", "3/2", "1/0", "1", "a/b", "1/2/3"])
+def test_parse_shard_invalid(value: str) -> None:
+    """Test that invalid shards raise an error."""
+    with pytest.raises(ValueError):
+        parse_shard(value)
+
+
+def test_shard_entries_hash() -> None:
+    """Test that hash sharding is a stable, complete partition."""
+    repos = _repos(50)
+    shards = [shard_entries(repos, i, 3) for i in range(1, 4)]
+
+    assert sorted(r["url"] for shard in shards for r in shard) == sorted(r["url"] for r in repos)
+    assert shards == [shard_entries(repos, i, 3) for i in range(1, 4)]
+    # Batchfile order is kept within a shard
+    assert shards[0] == [r for r in repos if r in shards[0]]
+
+
+def test_shard_entries_groups() -> None:
+    """Test that entries of the same url and branch stay together."""
+    repos = _repos(10)
+    repos += [{**repo, "path": "sub"} for repo in repos]
+
+    for weights in (None, {shard_key(repos[0]): 5.0}):
+        for index in (1, 2, 3):
+            keys = [shard_key(r) for r in shard_entries(repos, index, 3, weights)]
+            assert all(keys.count(key) == 2 for key in keys)
+
+
+def test_shard_entries_weighted() -> None:
+    """Test that weighted sharding balances the expected durations."""
+    repos = _repos(5)
+    weights = {shard_key(r): w for r, w in zip(repos, [10.0, 6.0, 4.0, 3.0, 3.0], strict=True)}
+
+    shards = [shard_entries(repos, i, 2, weights) for i in (1, 2)]
+    loads = [sum(weights[shard_key(r)] for r in shard) for shard in shards]
+
+    assert loads == [13.0, 13.0]
+    assert shards[0][0] == repos[0]
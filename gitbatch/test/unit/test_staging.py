@@ -0,0 +1,175 @@
+import errno
+import os
+from collections.abc import Iterator
+from pathlib import Path
+
+import pytest
+
+from gitbatch.utils.staging import (
+    DiskBudget,
+    overlap_groups,
+    publish_tree,
+    strip_git,
+    tree_size,
+)
+
+
+def test_tree_size(tmp_path: Path) -> None:
+    """Test that the size of a directory tree is summed up."""
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "sub" / "file.txt").write_text("x" * 10000)
+
+    assert tree_size(str(tmp_path)) >= 10000
+
+
+def test_strip_git(tmp_path: Path) -> None:
+    """Test that git metadata is removed on all levels."""
+    (tmp_path / ".git" / "objects").mkdir(parents=True)
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "sub" / ".git").write_text("gitdir: ../.git/modules/sub")
+    (tmp_path / "sub" / "file.txt").write_text("content")
+
+    strip_git(str(tmp_path))
+
+    assert not (tmp_path / ".git").exists()
+    assert not (tmp_path / "sub" / ".git").exists()
+    assert (tmp_path / "sub" / "file.txt").exists()
+
+
+def test_publish_tree(tmp_path: Path) -> None:
+    """Test that a staged tree is renamed into a new destination."""
+    src = tmp_path / "staged"
+    (src / ".git").mkdir(parents=True)
+    (src / "file.txt").write_text("new")
+    dest = tmp_path / "dest"
+
+    publish_tree(str(src), str(dest))
+
+    assert not src.exists()
+    assert (dest / "file.txt").read_text() == "new"
+    assert not (dest / ".git").exists()
+
+
+def test_publish_tree_existing(tmp_path: Path) -> None:
+    """Test that an existing destination is only replaced if requested."""
+    src = tmp_path / "staged"
+    src.mkdir()
+    (src / "file.txt").write_text("new")
+    dest = tmp_path / "dest"
+    dest.mkdir()
+    (dest / "stale.txt").write_text("old")
+
+    with pytest.raises(FileExistsError):
+        publish_tree(str(src), str(dest))
+    assert (dest / "stale.txt").exists()
+
+    publish_tree(str(src), str(dest), replace=True)
+
+    assert (dest / "file.txt").read_text() == "new"
+    assert not (dest / "stale.txt").exists()
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["dest"]
+
+
+def _staged_and_dest(tmp_path: Path) -> tuple[Path, Path]:
+    src = tmp_path / "staged"
+    src.mkdir()
+    (src / "file.txt").write_text("new")
+    dest = tmp_path / "dest"
+    dest.mkdir()
+    (dest / "file.txt").write_text("old")
+    return src, dest
+
+
+def test_publish_tree_restore(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that the previous destination is restored if the new tree fails to move."""
+    src, dest = _staged_and_dest(tmp_path)
+    rename = os.rename
+
+    def fake_rename(a: str, b: str) -> None:
+        if a == str(src):
+            raise OSError(errno.EXDEV, "Invalid cross-device link")
+        rename(a, b)
+
+    monkeypatch.setattr(os, "rename", fake_rename)
+    with pytest.raises(OSError, match="cross-device"):
+        publish_tree(str(src), str(dest), replace=True)
+
+    assert (dest / "file.txt").read_text() == "old"
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["dest", "staged"]
+
+
+def test_publish_tree_keep_backup(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that the backup is kept if the previous destination cannot be restored."""
+    src, dest = _staged_and_dest(tmp_path)
+    rename = os.rename
+
+    def fake_rename(a: str, b: str) -> None:
+        if a == str(src) or b == str(dest):
+            raise OSError(errno.EIO, "Input/output error")
+        rename(a, b)
+
+    monkeypatch.setattr(os, "rename", fake_rename)
+    with pytest.raises(OSError, match="previous content kept at") as exc:
+        publish_tree(str(src), str(dest), replace=True)
+
+    backup = Path(str(exc.value.strerror).rsplit(" ", 1)[-1])
+    assert (backup / "file.txt").read_text() == "old"
+    assert not dest.exists()
+
+
+def test_overlap_groups() -> None:
+    """Test that entries with the same or nested destinations are grouped."""
+    dests = ["/out/a", "/out/b", "/out/a/sub", "/out/ab", "/out/b", "/out/c/d", "/out/c"]
+    groups = overlap_groups([{"dest": dest} for dest in dests])
+    assert sorted(groups) == [[0, 2], [1, 4], [5, 6]]
+
+
+def test_disk_budget_unlimited() -> None:
+    """Test that everything is admitted in order without a limit."""
+    budget = DiskBudget()
+    assert budget.admit([None, 100]) == 0
+    assert budget.acquire(None) == 0
+    assert budget.admit([]) is None
+
+
+def test_disk_budget_admit_lazy() -> None:
+    """Test that estimates are only consumed up to the admitted entry."""
+
+    def estimates() -> Iterator[int | None]:
+        yield 10
+        yield 60
+        raise AssertionError("consumed past the admitted entry")
+
+    assert DiskBudget().admit(estimates()) == 0
+    assert DiskBudget(100).admit(estimates()) == 0
+
+
+def test_disk_budget_admit() -> None:
+    """Test that entries are only admitted when they fit."""
+    budget = DiskBudget(100)
+
+    assert budget.admit([60, 50, 30]) == 0
+    held = budget.acquire(60)
+
+    # 50 does not fit anymore, but 30 can overtake it
+    assert budget.admit([50, 30]) == 1
+    budget.acquire(30)
+    assert budget.admit([50]) is None
+
+    budget.release(held)
+    assert budget.admit([50]) == 0
+
+
+def test_disk_budget_unknown_and_oversized() -> None:
+    """Test that unknown and oversized entries only run on an idle budget."""
+    budget = DiskBudget(100)
+
+    assert budget.admit([None, 10]) == 0
+    held = budget.acquire(None)
+    assert held == 100
+    assert budget.admit([None, 10]) is None
+
+    budget.release(held)
+    assert budget.admit([500]) == 0
+    budget.acquire(10)
+    assert budget.admit([500]) is None
@@ -0,0 +1,73 @@
+from pathlib import Path
+
+import git
+import pytest
+
+from gitbatch.utils.submodules import list_submodules, normalize_url, update
+
+
+def _commit(repo: git.Repo, name: str) -> str:
+    assert repo.working_tree_dir is not None
+    (Path(repo.working_tree_dir) / name).write_text(name)
+    repo.index.add([name])
+    return repo.index.commit(name).hexsha
+
+
+@pytest.fixture
+def superproject(tmp_path: Path) -> tuple[git.Repo, str]:
+    """Create a local repository with a single submodule."""
+    lib = git.Repo.init(tmp_path / "lib", initial_branch="main")
+    sha = _commit(lib, "lib.txt")
+
+    repo = git.Repo.init(tmp_path / "super", initial_branch="main")
+    repo.git.execute(
+        [
+            "git",
+            "-c",
+            "protocol.file.allow=always",
+            "submodule",
+            "add",
+            "--quiet",
+            str(tmp_path / "lib"),
+            "deps/lib",
+        ]
+    )
+    _commit(repo, "super.txt")
+    return repo, sha
+
+
+@pytest.mark.parametrize(
+    "url,expected",
+    [
+        ("https://example.com/repo.git", "https://example.com/repo"),
+        ("https://example.com/repo/", "https://example.com/repo"),
+        ("https://example.com/repo.git/", "https://example.com/repo"),
+    ],
+)
+def test_normalize_url(url: str, expected: str) -> None:
+    """Test that cosmetic URL differences are ignored."""
+    assert normalize_url(url) == expected
+
+
+def test_list_submodules(tmp_path: Path, superproject: tuple[git.Repo, str]) -> None:
+    """Test that submodules are initialized and described."""
+    _, sha = superproject
+    clone = git.Repo.clone_from(str(tmp_path / "super"), tmp_path / "clone")
+
+    assert list_submodules(clone) == [
+        {"name": "deps/lib", "path": "deps/lib", "url": str(tmp_path / "lib"), "commit": sha}
+    ]
+
+
+def test_list_submodules_none(tmp_path: Path) -> None:
+    """Test that repositories without submodules yield nothing."""
+    repo = git.Repo.init(tmp_path / "plain", initial_branch="main")
+    _commit(repo, "file.txt")
+
+    assert list_submodules(repo) == []
+
+
+def test_update_nothing(tmp_path: Path) -> None:
+    """Test that an empty path list does not call git."""
+    repo = git.Repo.init(tmp_path / "plain")
+    update(repo, [])
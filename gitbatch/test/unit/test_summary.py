@@ -0,0 +1,34 @@
+import json
+
+from gitbatch.utils.summary import EntryError, format_json, format_table
+
+RESULTS = [
+    {"name": "repo", "ref": "main", "dest": "./a", "status": "ok", "reason": ""},
+    {"name": "other", "ref": "dev", "dest": "./b", "status": "failed", "reason": "boom\nbang"},
+]
+
+
+def test_entry_error() -> None:
+    """Test that entry errors carry status and reason."""
+    err = EntryError("failed", "boom")
+    assert err.status == "failed"
+    assert err.reason == "boom"
+    assert str(err) == "boom"
+
+
+def test_format_table() -> None:
+    """Test that results are rendered as aligned table."""
+    lines = format_table(RESULTS).splitlines()
+
+    assert lines[0].split() == ["STATUS", "NAME", "REF", "DEST", "REASON"]
+    assert lines[1].split() == ["ok", "repo", "main", "./a"]
+    assert lines[2].endswith("boom bang")
+    assert lines[1].index("repo") == lines[2].index("other")
+
+
+def test_format_json() -> None:
+    """Test that results are rendered as JSON with counts."""
+    data = json.loads(format_json(RESULTS))
+
+    assert data["results"] == RESULTS
+    assert data["counts"] == {"ok": 1, "skipped-existing": 0, "missing-branch": 0, "failed": 1}
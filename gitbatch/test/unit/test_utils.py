@@ -0,0 +1,24 @@
+import pytest
+
+from gitbatch.utils import parse_size
+
+
+@pytest.mark.parametrize(
+    "value,expected",
+    [
+        ("1024", 1024),
+        ("2k", 2048),
+        ("512M", 512 * 1024**2),
+        ("1.5GiB", int(1.5 * 1024**3)),
+        (" 1 TB ", 1024**4),
+    ],
+)
+def test_parse_size(value: str, expected: int) -> None:
+    """Test that human readable sizes are converted to bytes."""
+    assert parse_size(value) == expected
+
+
+def test_parse_size_invalid() -> None:
+    """Test that invalid sizes raise an error."""
+    with pytest.raises(ValueError):
+        parse_size("lots")
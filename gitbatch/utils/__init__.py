@@ -1,6 +1,7 @@
 """Global utility methods and classes."""
 
 import os
+import re
 from typing import Any
 
 
@@ -39,6 +40,24 @@ def to_bool(string: Any) -> bool:
     return bool(strtobool(str(string)))
 
 
+def parse_size(value: Any) -> int:
+    """Convert a size like `512M`, `2GiB` or plain bytes to bytes."""
+
+    match = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([kmgt]?)(?:i?b)?\s*", str(value), re.IGNORECASE)
+    if not match:
+        raise ValueError(f'"{value}" is not a valid size')
+
+    num, unit = match.groups()
+    return int(float(num) * 1024 ** " kmgt".index(unit.lower() or " "))
+
+
+def cache_dir() -> str:
+    """Return the default directory for persistent git-batch state."""
+
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join("~", ".cache")
+    return os.path.abspath(os.path.expanduser(os.path.join(base, "git-batch")))
+
+
 class Singleton(type):
     """Meta singleton class."""
 
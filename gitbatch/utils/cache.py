@@ -0,0 +1,170 @@
+"""
+Repository cache utils.
+
+Keeps one bare repository per remote URL, so objects are fetched once and
+checkouts of the same URL share them through git alternates.
+"""
+
+import contextlib
+import hashlib
+import os
+import shutil
+import threading
+from urllib.parse import urlparse
+
+import git
+
+from gitbatch.utils import refs
+
+
+class RepoCache:
+    """URL-keyed store of bare repositories."""
+
+    def __init__(self, root: str) -> None:
+        """
+        Initialize a new repository cache.
+
+        :param root: Directory holding the bare repositories
+        :returns: None
+
+        """
+        self.root = root
+        self._locks: dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+
+    def path(self, url: str) -> str:
+        name = os.path.basename(urlparse(url).path.rstrip("/")).removesuffix(".git")
+        digest = hashlib.sha256(url.encode("utf-8")).hexdigest()[:16]
+        return os.path.join(self.root, f"{name}-{digest}.git")
+
+    def lock(self, url: str) -> threading.Lock:
+        """Return the lock serializing updates of a cached repository."""
+        with self._locks_guard:
+            return self._locks.setdefault(url, threading.Lock())
+
+    def open(self, url: str) -> git.Repo:
+        """Open the bare repository of a URL, creating it if needed."""
+        path = self.path(url)
+        if os.path.isdir(path):
+            return git.Repo(path)
+
+        repo = git.Repo.init(path, mkdir=True, bare=True)
+        repo.create_remote("origin", url)
+        return repo
+
+    def resolve(self, url: str, name: str, ref_type: str) -> str | None:
+        """Return the commit of a ref if it is present in the cache."""
+        if not os.path.isdir(self.path(url)):
+            return None
+
+        with contextlib.suppress(git.exc.GitCommandError):
+            rev = refs.ref_name(name, ref_type)
+            commit: str = git.Repo(self.path(url)).git.rev_parse(
+                "--verify", "--quiet", f"{rev}^{{commit}}"
+            )
+            return commit
+        return None
+
+    def update(
+        self, url: str, name: str, ref_type: str, progress: git.RemoteProgress | None = None
+    ) -> str:
+        """
+        Make a ref available in the cache and return its commit.
+
+        Pinned refs that are already cached are resolved without network
+        access, branches are always fetched. Like `git clone --branch`, a
+        branch name that only exists as tag on the remote falls back to the
+        tag. A repository created for a failed first fetch is removed again.
+
+        :param url: Remote URL
+        :param name: Ref name or commit SHA
+        :param ref_type: One of `branch`, `tag` or `commit`
+        :param progress: Optional progress handler
+        :returns: Commit SHA
+
+        """
+        with self.lock(url):
+            commit = self.resolve(url, name, ref_type) if refs.is_pinned(ref_type) else None
+            if commit is None:
+                created = not os.path.isdir(self.path(url))
+                try:
+                    ref_type = self._fetch(url, name, ref_type, progress)
+                except BaseException:
+                    if created:
+                        shutil.rmtree(self.path(url), ignore_errors=True)
+                    raise
+                commit = self.resolve(url, name, ref_type)
+
+        if commit is None:
+            raise git.exc.GitCommandError(["rev-parse", name], 1, f"fatal: unknown ref {name}\n")
+        return commit
+
+    def _fetch(
+        self, url: str, name: str, ref_type: str, progress: git.RemoteProgress | None = None
+    ) -> str:
+        repo = self.open(url)
+        try:
+            refs.fetch(repo, "origin", refs.refspec(name, ref_type), progress=progress)
+        except git.exc.GitCommandError:
+            # Only ask the remote for a tag if the branch could not be fetched
+            if ref_type != "branch" or not self._has_tag(repo, name):
+                raise
+            refs.fetch(repo, "origin", refs.refspec(name, "tag"), progress=progress)
+            return "tag"
+        return ref_type
+
+    def _has_tag(self, repo: git.Repo, name: str) -> bool:
+        with contextlib.suppress(git.exc.GitCommandError):
+            return bool(repo.git.ls_remote("--tags", "origin", f"refs/tags/{name}"))
+        return False
+
+    def checkout(self, url: str, commit: str, dest: str) -> git.Repo:
+        """Check out a cached commit into a new repository borrowing the cache objects."""
+        repo = git.Repo.init(dest, mkdir=True)
+        if "origin" not in [remote.name for remote in repo.remotes]:
+            # Relative submodule URLs are resolved against the origin remote
+            repo.create_remote("origin", url)
+        with open(os.path.join(repo.git_dir, "objects", "info", "alternates"), "w") as f:
+            f.write(os.path.join(self.path(url), "objects") + "\n")
+
+        refs.checkout(repo, commit)
+        return repo
+
+    def worktree(self, url: str, commit: str, dest: str) -> git.Repo:
+        """
+        Check out a cached commit as linked worktree of the cached repository.
+
+        An existing worktree of the same cache is moved to the commit, which
+        only touches files that differ. Worktrees are detached, so the same
+        branch can be checked out into several destinations.
+
+        :param url: Remote URL
+        :param commit: Commit SHA to check out
+        :param dest: Worktree path
+        :returns: Worktree repository
+
+        """
+        if os.path.lexists(dest):
+            if not self.is_worktree(url, dest):
+                raise FileExistsError(dest)
+
+            repo = git.Repo(dest)
+            refs.checkout(repo, commit, force=True)
+            return repo
+
+        os.makedirs(os.path.dirname(dest), 0o750, exist_ok=True)
+        with self.lock(url):
+            bare = self.open(url)
+            # Drop metadata of worktrees that were removed from disk
+            bare.git.worktree("prune")
+            bare.git.worktree("add", "--detach", "--quiet", dest, commit)
+        return git.Repo(dest)
+
+    def is_worktree(self, url: str, path: str) -> bool:
+        if not os.path.isfile(os.path.join(path, ".git")):
+            return False
+
+        with contextlib.suppress(git.exc.InvalidGitRepositoryError, git.exc.NoSuchPathError):
+            common_dir = git.Repo(path).common_dir
+            return os.path.realpath(common_dir) == os.path.realpath(self.path(url))
+        return False
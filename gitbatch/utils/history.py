@@ -0,0 +1,122 @@
+"""
+Run history utils.
+
+Persists per-entry measurements of previous runs, e.g. the disk footprint of
+a clone or the time it took, to improve scheduling of later runs.
+"""
+
+import contextlib
+import json
+import os
+import tempfile
+import threading
+from typing import Any
+
+
+def history_key(repo: dict[str, Any]) -> str:
+    """Return the history key of a batchfile entry."""
+    return "{}#{}:{}".format(repo["url"], repo["branch"], repo["path"] or "")
+
+
+def order_entries(
+    repos: list[dict[str, Any]], history: "History", jobs: int = 1
+) -> list[dict[str, Any]]:
+    """
+    Order entries longest-expected-first by their recorded durations.
+
+    After every `jobs` long entries the shortest remaining one is started,
+    so results show up early while the long tail starts first. Entries
+    without history count as the mean known duration. This only decides
+    the submission order: the scheduler still runs entries with the same or
+    nested destinations one after another in batchfile order.
+
+    :param repos: Parsed batchfile entries
+    :param history: Run history with durations
+    :param jobs: Number of concurrent workers
+    :returns: Reordered entries, or batchfile order for a single worker or
+        without any history
+
+    """
+    durations = [history.get(history_key(repo)).get("duration") for repo in repos]
+    known = [d for d in durations if d is not None]
+    if jobs <= 1 or not known:
+        return list(repos)
+
+    default = sum(known) / len(known)
+    expected = [d if d is not None else default for d in durations]
+    # sorted() is stable, so equal durations keep their batchfile order
+    ranked = sorted(range(len(repos)), key=lambda i: -expected[i])
+
+    ordered = []
+    lo, hi = 0, len(ranked) - 1
+    while lo <= hi:
+        for _ in range(jobs):
+            if lo > hi:
+                break
+            ordered.append(repos[ranked[lo]])
+            lo += 1
+        if lo <= hi:
+            ordered.append(repos[ranked[hi]])
+            hi -= 1
+    return ordered
+
+
+class History:
+    """Thread-safe JSON store of per-entry measurements."""
+
+    def __init__(self, path: str | None, strict: bool = False) -> None:
+        """
+        Initialize a new history store.
+
+        :param path: Path of the JSON file, `None` keeps the history in memory only
+        :param strict: Raise if the file is missing or invalid instead of starting empty
+        :returns: None
+
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries: dict[str, dict[str, Any]] = {}
+        self._dirty = False
+
+        if path and (strict or os.path.isfile(path)):
+            try:
+                with open(path) as f:
+                    entries = json.load(f)
+                if not isinstance(entries, dict):
+                    raise ValueError("expected a JSON object")
+                self._entries = entries
+            except (OSError, ValueError):
+                if strict:
+                    raise
+
+    def get(self, key: str) -> dict[str, Any]:
+        with self._lock:
+            return dict(self._entries.get(key, {}))
+
+    def update(self, key: str, **values: Any) -> None:
+        with self._lock:
+            self._entries.setdefault(key, {}).update(values)
+            self._dirty = True
+
+    def remove(self, key: str) -> None:
+        with self._lock:
+            if self._entries.pop(key, None) is not None:
+                self._dirty = True
+
+    def save(self) -> None:
+        """Write the history atomically, skipped if nothing has changed."""
+        if not self.path or not self._dirty:
+            return
+
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            fd, tmp = tempfile.mkstemp(prefix=".history_", dir=os.path.dirname(self.path))
+            try:
+                with os.fdopen(fd, "w") as f:
+                    json.dump(self._entries, f)
+                os.replace(tmp, self.path)
+            except BaseException:
+                with contextlib.suppress(OSError):
+                    os.unlink(tmp)
+                raise
+            self._dirty = False
@@ -0,0 +1,117 @@
+"""
+Batchfile index utils.
+
+Caches the parsed entries of a batchfile, keyed by its content and the
+environment used to resolve destinations, and validates entries against
+each other.
+"""
+
+import contextlib
+import hashlib
+import json
+import os
+import re
+import tempfile
+from pathlib import Path
+from typing import Any
+
+INDEX_VERSION = 1
+
+_VAR_RE = re.compile(r"\$(\w+)|\$\{([^}]*)\}")
+
+
+def index_key(content: bytes) -> str:
+    """
+    Return the cache key of a batchfile.
+
+    Besides the content, the key covers everything `normalize_path` depends
+    on: the working directory, the home directory and all referenced
+    environment variables.
+
+    :param content: Raw batchfile content
+    :returns: Hex digest
+
+    """
+    text = content.decode("utf-8", "replace")
+    names = sorted({a or b for a, b in _VAR_RE.findall(text)})
+
+    digest = hashlib.sha256(f"v{INDEX_VERSION}".encode())
+    digest.update(content)
+    for part in [os.getcwd(), os.path.expanduser("~")]:
+        digest.update(b"\0" + part.encode("utf-8"))
+    for name in names:
+        digest.update(b"\0" + f"{name}={os.environ.get(name, '')}".encode())
+    return digest.hexdigest()
+
+
+class BatchIndex:
+    """Store of compiled batchfiles, one index file per batchfile path."""
+
+    def __init__(self, root: str) -> None:
+        self.root = root
+
+    def path(self, src: str) -> str:
+        digest = hashlib.sha256(os.path.abspath(src).encode("utf-8")).hexdigest()[:16]
+        return os.path.join(self.root, f"{digest}.json")
+
+    def load(self, src: str, key: str) -> list[dict[str, Any]] | None:
+        """Return the cached entries of a batchfile or `None` if outdated."""
+        with contextlib.suppress(OSError, ValueError), open(self.path(src)) as f:
+            data = json.load(f)
+            if data.get("key") == key:
+                repos: list[dict[str, Any]] = data["repos"]
+                for repo in repos:
+                    repo["path"] = Path(repo["path"]) if repo["path"] is not None else None
+                return repos
+        return None
+
+    def save(self, src: str, key: str, repos: list[dict[str, Any]]) -> None:
+        entries = [{**repo, "path": str(repo["path"]) if repo["path"] else None} for repo in repos]
+
+        os.makedirs(self.root, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(prefix=".index_", dir=self.root)
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump({"key": key, "repos": entries}, f)
+            os.replace(tmp, self.path(src))
+        except BaseException:
+            with contextlib.suppress(OSError):
+                os.unlink(tmp)
+            raise
+
+
+def find_conflicts(repos: list[dict[str, Any]]) -> list[str]:
+    """
+    Find entries that write to the same or to nested destinations.
+
+    :param repos: Parsed batchfile entries with line numbers
+    :returns: List of problem descriptions
+
+    """
+    problems: list[tuple[int, str]] = []
+    dests: dict[str, dict[str, Any]] = {}
+
+    for repo in repos:
+        first = dests.setdefault(repo["dest"], repo)
+        if first is repo:
+            continue
+
+        same = all(first[k] == repo[k] for k in ("url", "branch", "path"))
+        message = "{} in line {}, same destination as line {}".format(
+            "Duplicate entry" if same else "Conflicting entry", repo["line"], first["line"]
+        )
+        problems.append((repo["line"], message))
+
+    for dest, repo in dests.items():
+        child, parent = dest, os.path.dirname(dest)
+        while parent != child:
+            outer = dests.get(parent)
+            if outer is not None:
+                message = "Destination of line {} is inside the destination of line {}".format(
+                    repo["line"], outer["line"]
+                )
+                problems.append((repo["line"], message))
+                break
+            child, parent = parent, os.path.dirname(parent)
+
+    return [message for _, message in sorted(problems)]
@@ -0,0 +1,221 @@
+"""
+Aggregate progress utils.
+
+Collects the progress reported by concurrent `git clone` calls and renders a
+single status line for TTYs or rate-limited JSON records for CI logs.
+"""
+
+import json
+import os
+import re
+import sys
+import threading
+import time
+from collections.abc import Callable
+from typing import IO, Any
+
+import git
+
+PROGRESS_MODES = ["auto", "tty", "json", "off"]
+PROGRESS_INTERVALS = {"tty": 0.2, "json": 10.0}
+
+_SIZE_RE = re.compile(r"(\d+(?:\.\d+)?) (bytes|KiB|MiB|GiB|TiB)")
+_SIZE_UNITS = {"bytes": 1, "KiB": 1024, "MiB": 1024**2, "GiB": 1024**3, "TiB": 1024**4}
+
+
+def format_size(num: float) -> str:
+    for unit in ["B", "KiB", "MiB", "GiB"]:
+        if abs(num) < 1024:
+            return f"{num:.1f} {unit}"
+        num /= 1024
+    return f"{num:.1f} TiB"
+
+
+def format_duration(seconds: float | None) -> str:
+    if seconds is None:
+        return "--:--"
+    minutes, secs = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    if hours:
+        return f"{hours}:{minutes:02d}:{secs:02d}"
+    return f"{minutes:02d}:{secs:02d}"
+
+
+class RepoProgress(git.RemoteProgress):
+    """Progress handler for a single clone, reporting to a `BatchProgress`."""
+
+    def __init__(self, batch: "BatchProgress", name: str) -> None:
+        super().__init__()
+        self.batch = batch
+        self.name = name
+        self.objects = 0
+        self.bytes = 0
+        self.fraction = 0.0
+        # Non-progress output in the order git wrote it; the base class
+        # splits it into `error_lines` and `other_lines`
+        self.lines: list[str] = []
+
+    def new_message_handler(self) -> Callable[[str], None]:
+        # Checked against GitPython 3.1 and 3.2: every parsed line that is not
+        # progress is appended to either `error_lines` or `other_lines`
+        handler = super().new_message_handler()
+
+        def record(line: str) -> None:
+            errors, others = len(self.error_lines), len(self.other_lines)
+            handler(line)
+            self.lines += self.error_lines[errors:] + self.other_lines[others:]
+
+        return record
+
+    def update(
+        self,
+        op_code: int,
+        cur_count: str | float,
+        max_count: str | float | None = None,
+        message: str = "",
+    ) -> None:
+        if not op_code & self.RECEIVING:
+            return
+
+        cur = float(cur_count or 0)
+        self.objects = int(cur)
+        if max_count:
+            self.fraction = cur / float(max_count)
+        if message:
+            match = _SIZE_RE.search(message)
+            if match:
+                self.bytes = int(float(match.group(1)) * _SIZE_UNITS[match.group(2)])
+
+        self.batch.refresh()
+
+
+class BatchProgress:
+    """Aggregated progress of all clones in a batch run."""
+
+    def __init__(
+        self,
+        total: int,
+        mode: str = "off",
+        interval: float | None = None,
+        stream: IO[str] | None = None,
+    ) -> None:
+        """
+        Initialize a new batch progress.
+
+        :param total: Number of repositories in the batch
+        :param mode: One of `auto`, `tty`, `json` or `off`
+        :param interval: Minimum seconds between two renders
+        :param stream: Output stream, defaults to stderr
+        :returns: None
+
+        """
+        self.stream = stream or sys.stderr
+        if mode == "auto":
+            mode = "tty" if self.stream.isatty() and os.environ.get("TERM") != "dumb" else "off"
+
+        self.mode = mode
+        self.interval = interval if interval is not None else PROGRESS_INTERVALS.get(mode, 1.0)
+        self.total = total
+        self.done = 0
+
+        self._active: list[RepoProgress] = []
+        self._bytes = 0
+        self._objects = 0
+        self._lock = threading.Lock()
+        self._start = time.monotonic()
+        self._next = self._start
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode != "off"
+
+    def start(self, name: str) -> RepoProgress | None:
+        """Register a clone and return the handler to pass to `clone_from`."""
+        if not self.enabled:
+            return None
+
+        handler = RepoProgress(self, name)
+        with self._lock:
+            self._active.append(handler)
+        self.refresh()
+        return handler
+
+    def finish(self, handler: RepoProgress | None) -> None:
+        """Mark a repository as done, whether it was cloned or skipped."""
+        with self._lock:
+            self.done += 1
+            if handler is not None and handler in self._active:
+                self._active.remove(handler)
+                self._bytes += handler.bytes
+                self._objects += handler.objects
+        self.refresh()
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            active = list(self._active)
+            done = self.done
+            total_bytes = self._bytes + sum(h.bytes for h in active)
+            total_objects = self._objects + sum(h.objects for h in active)
+
+        elapsed = max(time.monotonic() - self._start, 1e-6)
+        completed = done + sum(min(h.fraction, 1.0) for h in active)
+        eta = None
+        if completed > 0:
+            eta = max(elapsed * (self.total - completed) / completed, 0.0)
+
+        return {
+            "done": done,
+            "total": self.total,
+            "bytes": total_bytes,
+            "objects": total_objects,
+            "elapsed": round(elapsed, 3),
+            "bytes_per_sec": round(total_bytes / elapsed, 1),
+            "objects_per_sec": round(total_objects / elapsed, 1),
+            "eta": round(eta, 1) if eta is not None else None,
+            "active": [h.name for h in active],
+        }
+
+    def refresh(self, force: bool = False) -> None:
+        """Render the current state if the rate limit allows it."""
+        if not self.enabled:
+            return
+
+        now = time.monotonic()
+        if not force and now < self._next:
+            return
+        self._next = now + self.interval
+
+        self._render(self.snapshot())
+
+    def close(self) -> None:
+        """Render the final state and terminate the status line."""
+        if not self.enabled:
+            return
+
+        self._render(self.snapshot())
+        if self.mode == "tty":
+            self.stream.write("\n")
+            self.stream.flush()
+
+    def _render(self, state: dict[str, Any]) -> None:
+        if self.mode == "json":
+            self.stream.write(json.dumps({"progress": state}) + "\n")
+            self.stream.flush()
+            return
+
+        active = ", ".join(state["active"][:3])
+        if len(state["active"]) > 3:
+            active += ", +{}".format(len(state["active"]) - 3)
+
+        line = "[{}/{}] {}/s, {:.0f} obj/s, ETA {}".format(
+            state["done"],
+            state["total"],
+            format_size(state["bytes_per_sec"]),
+            state["objects_per_sec"],
+            format_duration(state["eta"]),
+        )
+        if active:
+            line += f" | {active}"
+
+        self.stream.write(f"\r\033[K{line}")
+        self.stream.flush()
@@ -0,0 +1,83 @@
+"""
+Git ref utils.
+
+Parsing of the refs given in a batchfile and fetch helpers shared by direct
+and cached checkouts.
+"""
+
+import re
+
+import git
+from git.cmd import handle_process_output
+from git.util import finalize_process
+
+REF_TYPES = ["branch", "tag", "commit"]
+
+_SHA_RE = re.compile(r"[0-9a-f]{40}|[0-9a-f]{64}")
+
+
+def parse_ref(ref: str) -> tuple[str, str]:
+    """
+    Split a batchfile ref into its name and type.
+
+    Full commit SHAs and `refs/tags/` refs are immutable pins, everything
+    else is treated as a moving branch.
+
+    :param ref: Ref as given in the batchfile
+    :returns: Tuple of ref name and ref type
+
+    """
+    if _SHA_RE.fullmatch(ref):
+        return ref, "commit"
+    if ref.startswith("refs/tags/"):
+        return ref.removeprefix("refs/tags/"), "tag"
+    return ref.removeprefix("refs/heads/"), "branch"
+
+
+def is_pinned(ref_type: str) -> bool:
+    return ref_type in ("tag", "commit")
+
+
+def ref_name(name: str, ref_type: str) -> str:
+    """Return the fully qualified ref, or the SHA for commits."""
+    if ref_type == "tag":
+        return f"refs/tags/{name}"
+    if ref_type == "branch":
+        return f"refs/heads/{name}"
+    return name
+
+
+def refspec(name: str, ref_type: str) -> str:
+    """Return the refspec to fetch a ref into a local ref of the same name."""
+    if ref_type == "commit":
+        return f"{name}:refs/pins/{name}"
+    ref = ref_name(name, ref_type)
+    return f"+{ref}:{ref}"
+
+
+def fetch(repo: git.Repo, *args: str, progress: git.RemoteProgress | None = None) -> None:
+    """
+    Run `git fetch` in a repository.
+
+    Unlike `Remote.fetch` this does not parse the fetched refs, which fails
+    for refspecs with a plain SHA as source.
+
+    :param repo: Repository to fetch into
+    :param args: Arguments passed to `git fetch`
+    :param progress: Optional progress handler
+    :returns: None
+
+    """
+    if progress is None:
+        repo.git.fetch(*args)
+        return
+
+    proc = repo.git.fetch("--progress", *args, as_process=True)
+    handle_process_output(proc, None, progress.new_message_handler(), finalize_process)
+
+
+def checkout(repo: git.Repo, commit: str, force: bool = False) -> None:
+    args = ["--detach", "--quiet"]
+    if force:
+        args.append("--force")
+    repo.git.checkout(*args, commit)
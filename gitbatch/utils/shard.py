@@ -0,0 +1,80 @@
+"""
+Shard utils.
+
+Deterministic partitioning of batchfile entries across several nodes.
+Entries of the same URL and branch always land on the same shard, so they
+can share clones and caches.
+"""
+
+import hashlib
+from typing import Any
+
+
+def parse_shard(value: str) -> tuple[int, int]:
+    """
+    Parse a shard specification.
+
+    :param value: Shard as `i/N` with `1 <= i <= N`
+    :returns: Tuple of shard index and shard count
+
+    """
+    try:
+        index, count = (int(x) for x in value.split("/"))
+    except ValueError as err:
+        raise ValueError(f'"{value}" is not a valid shard, expected i/N') from err
+
+    if count < 1 or not 1 <= index <= count:
+        raise ValueError(f'"{value}" is not a valid shard, expected 1 <= i <= N')
+    return index, count
+
+
+def shard_key(repo: dict[str, Any]) -> str:
+    return "{}#{}".format(repo["url"], repo["branch"])
+
+
+def stable_hash(key: str) -> int:
+    return int.from_bytes(hashlib.sha256(key.encode("utf-8")).digest()[:8], "big")
+
+
+def shard_entries(
+    repos: list[dict[str, Any]],
+    index: int,
+    count: int,
+    weights: dict[str, float] | None = None,
+) -> list[dict[str, Any]]:
+    """
+    Select the entries of a shard.
+
+    Without weights entries are assigned by a stable hash of URL and branch.
+    With weights, groups of the same URL and branch are assigned greedily,
+    heaviest first, to the least loaded shard. Groups without a weight count
+    as the mean known weight. Every node has to use the same weights to get
+    a consistent partitioning.
+
+    :param repos: Parsed batchfile entries
+    :param index: Shard index, starting at 1
+    :param count: Number of shards
+    :param weights: Optional weight per shard key, e.g. expected durations
+    :returns: Entries of the shard in batchfile order
+
+    """
+    if weights is None:
+        return [r for r in repos if stable_hash(shard_key(r)) % count == index - 1]
+
+    groups: dict[str, float] = {}
+    for repo in repos:
+        groups.setdefault(shard_key(repo), 0.0)
+
+    known = [weights[key] for key in groups if key in weights]
+    default = sum(known) / len(known) if known else 1.0
+    for key in groups:
+        groups[key] = weights.get(key, default)
+
+    loads = [0.0] * count
+    assignment: dict[str, int] = {}
+    for key in sorted(groups, key=lambda k: (-groups[k], stable_hash(k))):
+        target = min(range(count), key=lambda i: (loads[i], i))
+        loads[target] += groups[key]
+        assignment[key] = target
+
+    return [r for r in repos if assignment[shard_key(r)] == index - 1]
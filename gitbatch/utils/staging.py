@@ -0,0 +1,180 @@
+"""
+Staging utils.
+
+Accounting of the temporary disk space used by clones and publishing of the
+staged content into the destination.
+"""
+
+import os
+import shutil
+import tempfile
+import threading
+from collections.abc import Iterable
+from typing import Any
+
+PUBLISH_MODES = ["copy", "rename", "worktree"]
+
+_dest_locks: dict[str, threading.Lock] = {}
+_dest_locks_guard = threading.Lock()
+
+
+def _dest_lock(dest: str) -> threading.Lock:
+    with _dest_locks_guard:
+        return _dest_locks.setdefault(dest, threading.Lock())
+
+
+def overlap_groups(repos: list[dict[str, Any]]) -> list[list[int]]:
+    """
+    Group entries writing to the same or to nested destinations.
+
+    :param repos: Parsed batchfile entries
+    :returns: Positions of the entries of every group with more than one entry
+
+    """
+    first: dict[str, int] = {}
+    parent = list(range(len(repos)))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for i, repo in enumerate(repos):
+        parent[find(i)] = find(first.setdefault(repo["dest"], i))
+
+    for dest, i in first.items():
+        child, outer = dest, os.path.dirname(dest)
+        while outer != child:
+            if outer in first:
+                parent[find(i)] = find(first[outer])
+            child, outer = outer, os.path.dirname(outer)
+
+    groups: dict[int, list[int]] = {}
+    for i in range(len(repos)):
+        groups.setdefault(find(i), []).append(i)
+    return [group for group in groups.values() if len(group) > 1]
+
+
+def tree_size(path: str) -> int:
+    """Return the allocated disk space of a directory tree in bytes."""
+    total = 0
+    for root, dirs, files in os.walk(path):
+        for name in dirs + files:
+            try:
+                st = os.lstat(os.path.join(root, name))
+            except OSError:
+                continue
+            total += getattr(st, "st_blocks", 0) * 512 or st.st_size
+    return total
+
+
+def strip_git(path: str) -> None:
+    """Remove all `.git` directories and files below a directory tree."""
+    for root, dirs, files in os.walk(path):
+        if ".git" in dirs:
+            dirs.remove(".git")
+            shutil.rmtree(os.path.join(root, ".git"))
+        if ".git" in files:
+            os.unlink(os.path.join(root, ".git"))
+
+
+def publish_tree(src: str, dest: str, replace: bool = False) -> None:
+    """
+    Move a staged tree into place by renaming it.
+
+    An existing destination is renamed away first and removed after the new
+    tree took its place, so readers never see a partially written tree.
+    There is no atomic exchange, so the destination briefly does not exist
+    between the two renames. If the new tree cannot be moved in, the old one
+    is restored; if that fails too, it is kept and its path is reported.
+    Both paths need to be on the same filesystem.
+
+    :param src: Staged directory tree
+    :param dest: Destination path
+    :param replace: Replace an existing destination instead of failing
+    :returns: None
+
+    """
+    strip_git(src)
+
+    with _dest_lock(dest):
+        if not os.path.lexists(dest):
+            os.rename(src, dest)
+            return
+
+        if not replace:
+            raise FileExistsError(dest)
+
+        old = tempfile.mkdtemp(prefix=".gitbatch_old_", dir=os.path.dirname(dest))
+        backup = os.path.join(old, "tree")
+        os.rename(dest, backup)
+        try:
+            os.rename(src, dest)
+        except OSError as err:
+            try:
+                os.rename(backup, dest)
+            except OSError:
+                raise OSError(
+                    err.errno, f"{err.strerror}, previous content kept at {backup}", dest
+                ) from err
+            shutil.rmtree(old, ignore_errors=True)
+            raise
+
+        shutil.rmtree(old, ignore_errors=True)
+
+
+class DiskBudget:
+    """Admission control for the disk space used by concurrent clones."""
+
+    def __init__(self, limit: int | None = None) -> None:
+        """
+        Initialize a new disk budget.
+
+        :param limit: Budget in bytes, `None` disables the accounting
+        :returns: None
+
+        """
+        self.limit = limit
+        self.used = 0
+        self._lock = threading.Lock()
+
+    def admit(self, estimates: Iterable[int | None]) -> int | None:
+        """
+        Select the next pending entry that fits into the free budget.
+
+        Entries are considered in order, so later entries only overtake ones
+        that do not fit yet. Entries without an estimate are only started on
+        an idle budget, as are entries larger than the whole budget. The
+        estimates are consumed lazily and only up to the selected entry.
+
+        :param estimates: Estimated footprints of the pending entries
+        :returns: Index of the entry to start or `None` to wait
+
+        """
+        with self._lock:
+            idle = self.used == 0
+            free = self.limit - self.used if self.limit is not None else 0
+
+        index = None
+        for index, estimate in enumerate(estimates):
+            if self.limit is None:
+                return index
+            if estimate is None:
+                if idle:
+                    return index
+            elif estimate <= free:
+                return index
+
+        return 0 if idle and index is not None else None
+
+    def acquire(self, size: int | None) -> int:
+        """Account for a started entry and return the bytes held."""
+        held = size if size is not None else (self.limit or 0)
+        with self._lock:
+            self.used += held
+        return held
+
+    def release(self, size: int) -> None:
+        with self._lock:
+            self.used = max(self.used - size, 0)
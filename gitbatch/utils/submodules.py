@@ -0,0 +1,69 @@
+"""
+Submodule utils.
+
+Lists the submodules of a checkout and fetches them shallowly with
+`git submodule update`.
+"""
+
+from typing import Any
+
+import git
+
+
+def normalize_url(url: str) -> str:
+    """Return a URL form suitable to compare remotes."""
+    return url.rstrip("/").removesuffix(".git").rstrip("/")
+
+
+def _config_values(repo: git.Repo, pattern: str, *args: str) -> dict[str, str]:
+    try:
+        output = repo.git.config(*args, "--get-regexp", pattern)
+    except git.exc.GitCommandError:
+        # git config exits non-zero if nothing matches
+        return {}
+
+    values = {}
+    for line in output.splitlines():
+        key, _, value = line.partition(" ")
+        values[key] = value
+    return values
+
+
+def list_submodules(repo: git.Repo) -> list[dict[str, Any]]:
+    """
+    Initialize the submodules of a checkout and describe them.
+
+    :param repo: Checked out superproject
+    :returns: List of dicts with name, path, resolved url and recorded commit
+
+    """
+    if repo.working_tree_dir is None:
+        return []
+
+    repo.git.submodule("init", "--quiet")
+    urls = _config_values(repo, r"^submodule\..*\.url$")
+    paths = _config_values(repo, r"^submodule\..*\.path$", "--file", ".gitmodules")
+
+    modules = []
+    for key, url in urls.items():
+        name = key.removeprefix("submodule.").removesuffix(".url")
+        path = paths.get(f"submodule.{name}.path")
+        if not path:
+            continue
+
+        tree = repo.git.ls_tree("HEAD", "--", path).split()
+        if len(tree) < 3 or tree[1] != "commit":
+            continue
+
+        modules.append({"name": name, "path": path, "url": url, "commit": tree[2]})
+    return modules
+
+
+def update(repo: git.Repo, paths: list[str], jobs: int = 1, depth: int = 1) -> None:
+    """Fetch and check out submodules shallowly and in parallel, including nested ones."""
+    if not paths:
+        return
+
+    repo.git.submodule(
+        "update", "--init", "--recursive", f"--depth={depth}", f"--jobs={jobs}", "--", *paths
+    )
@@ -0,0 +1,40 @@
+"""
+Summary utils.
+
+Per-entry outcomes of a batch run and their rendering as table or JSON.
+"""
+
+import json
+from typing import Any
+
+STATUSES = ["ok", "skipped-existing", "missing-branch", "failed"]
+SUMMARY_COLUMNS = ["status", "name", "ref", "dest", "reason"]
+
+
+class EntryError(Exception):
+    """Failure of a single batchfile entry, raised in keep-going mode."""
+
+    def __init__(self, status: str, reason: str) -> None:
+        super().__init__(reason)
+        self.status = status
+        self.reason = reason
+
+
+def format_table(results: list[dict[str, Any]]) -> str:
+    """Render results as plain text table with one line per entry."""
+    rows = [[c.upper() for c in SUMMARY_COLUMNS]]
+    rows += [
+        [str(result.get(c, "")).replace("\n", " ") for c in SUMMARY_COLUMNS] for result in results
+    ]
+    widths = [max(len(row[i]) for row in rows) for i in range(len(SUMMARY_COLUMNS))]
+
+    lines = ["  ".join(cell.ljust(widths[i]) for i, cell in enumerate(row)) for row in rows]
+    return "\n".join(line.rstrip() for line in lines) + "\n"
+
+
+def format_json(results: list[dict[str, Any]]) -> str:
+    counts = dict.fromkeys(STATUSES, 0)
+    for result in results:
+        counts[result["status"]] += 1
+
+    return json.dumps({"results": results, "counts": counts}, indent=2) + "\n"